@@ -1,6 +1,6 @@
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.responses import FileResponse, Response
 from pydantic import BaseModel
 from typing import Optional, List, Any
 import os
@@ -12,17 +12,28 @@ import re
 import asyncio
 import math
 from urllib.parse import quote_plus
+import codecs
 import html
 import ipaddress
 from urllib.parse import urlparse
 import time
-
+import hashlib
+import heapq
+import sqlite3
+import tempfile
+import threading
+from collections import OrderedDict, deque
 
 try:
     from psycopg_pool import AsyncConnectionPool
 except Exception:  # pragma: no cover
     AsyncConnectionPool = None
 
+try:
+    import h2  # noqa: F401  (enables httpx HTTP/2)
+except Exception:  # pragma: no cover
+    h2 = None
+
 app = FastAPI(title="FUD Buddy API")
 
 cors_origins_raw = os.getenv(
@@ -68,6 +79,12 @@ MAX_TRAVEL_KM_DEFAULT = _env_float("MAX_TRAVEL_KM_DEFAULT", 35.0)
 TRAVEL_KM_PER_MIN = _env_float("TRAVEL_KM_PER_MIN", 1.0)
 MAX_TRAVEL_KM_CAP_DEFAULT = _env_float("MAX_TRAVEL_KM_CAP_DEFAULT", 70.0)
 
+# Ollama model residency: keep_alive is sent on every call; the model is warmed
+# at startup and pinged while idle so the first request doesn't pay the load.
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m").strip()
+OLLAMA_WARMUP = os.getenv("OLLAMA_WARMUP", "1") == "1"
+OLLAMA_KEEPWARM_INTERVAL_S = _env_float("OLLAMA_KEEPWARM_INTERVAL_S", 600.0)
+
 # Optional: OpenRouter (OpenAI-compatible) for faster testing
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "")
 OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
@@ -78,6 +95,129 @@ OPENROUTER_TIMEOUT_S = float(os.getenv("OPENROUTER_TIMEOUT_S", "45"))
 # If enabled, allow client headers to provide OpenRouter key/model.
 ALLOW_CLIENT_OPENROUTER = os.getenv("ALLOW_CLIENT_OPENROUTER", "0") == "1"
 
+# How Option A/B get generated:
+# - sequential: A first, then B (told to avoid A's pick)
+# - concurrent: A and B at once on their own source slices; duplicate/distance
+#   conflicts are resolved after both land.
+# - single: one streamed call asks for both options (covering both slices);
+#   conflicts are resolved the same way as in concurrent mode.
+OPTION_GENERATION_MODE = (
+    os.getenv("OPTION_GENERATION_MODE", "sequential").strip().lower() or "sequential"
+)
+
+# Stream option JSON token-by-token and emit partial `option` events as fields
+# complete (instead of waiting for the full completion).
+LLM_STREAM_OPTIONS = os.getenv("LLM_STREAM_OPTIONS", "0") == "1"
+
+
+def _env_int_map(name: str) -> dict[str, int]:
+    """Parse `key=int,key=int` (keys may contain ':' or '/', e.g. model ids)."""
+
+    out: dict[str, int] = {}
+    for part in os.getenv(name, "").split(","):
+        k, sep, v = part.strip().rpartition("=")
+        if not sep or not k.strip():
+            continue
+        try:
+            out[k.strip()] = int(v.strip())
+        except Exception:
+            continue
+    return out
+
+
+# Prompt token budget for an option prompt (preamble + search snippets). Prefill
+# dominates latency on CPU-only Ollama, so snippets are trimmed to fit.
+# PROMPT_TOKEN_BUDGETS overrides per model id or provider, e.g.
+# "ollama=900,qwen2.5:latest=800,openrouter=2500".
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "1200"))
+PROMPT_TOKEN_BUDGETS = _env_int_map("PROMPT_TOKEN_BUDGETS")
+
+
+# Long-lived pooled HTTP clients, one per upstream class. Created at startup (or
+# on first use) and closed at shutdown so calls reuse warm TCP/TLS connections.
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY_S = _env_float("HTTP_KEEPALIVE_EXPIRY_S", 30.0)
+HTTP2 = os.getenv("HTTP2", "0") == "1"
+
+# Per-upstream defaults; individual calls may still pass a tighter `timeout=`.
+_HTTP_UPSTREAMS: dict[str, dict[str, Any]] = {
+    "openrouter": {"timeout": OPENROUTER_TIMEOUT_S, "http2": True},
+    # Local and plain HTTP/1.1; generation is slow, so the timeout is generous.
+    "ollama": {"timeout": 180.0, "http2": False},
+    "searxng": {"timeout": 12.0, "follow_redirects": True, "http2": False},
+    # Nominatim's usage policy frowns on parallel connections.
+    "nominatim": {"timeout": 8.0, "follow_redirects": True, "max_connections": 2},
+    "google": {"timeout": 10.0, "http2": True},
+    # Arbitrary sites: og:image pages and proxied images.
+    "web": {"timeout": 10.0, "follow_redirects": True, "http2": True},
+}
+
+_http_clients: dict[str, httpx.AsyncClient] = {}
+_http_stats: dict[str, dict[str, int]] = {}
+
+
+def _new_http_client(name: str) -> httpx.AsyncClient:
+    spec = _HTTP_UPSTREAMS[name]
+    stats = _http_stats.setdefault(name, {"requests": 0, "clientsOpened": 0})
+    stats["clientsOpened"] += 1
+
+    async def _count(request: httpx.Request) -> None:
+        stats["requests"] += 1
+
+    limits = httpx.Limits(
+        max_connections=spec.get("max_connections", HTTP_MAX_CONNECTIONS),
+        max_keepalive_connections=min(
+            HTTP_MAX_KEEPALIVE, spec.get("max_connections", HTTP_MAX_CONNECTIONS)
+        ),
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_S,
+    )
+    return httpx.AsyncClient(
+        timeout=spec["timeout"],
+        limits=limits,
+        follow_redirects=spec.get("follow_redirects", False),
+        http2=HTTP2 and h2 is not None and spec.get("http2", True),
+        event_hooks={"request": [_count]},
+    )
+
+
+def _http_client(name: str) -> httpx.AsyncClient:
+    """Return the shared client for an upstream class (see `_HTTP_UPSTREAMS`)."""
+
+    client = _http_clients.get(name)
+    if client is None or client.is_closed:
+        client = _new_http_client(name)
+        _http_clients[name] = client
+    return client
+
+
+async def _close_http_clients() -> None:
+    clients = list(_http_clients.values())
+    _http_clients.clear()
+    for client in clients:
+        try:
+            await client.aclose()
+        except Exception:
+            pass
+
+
+def _http_pool_info() -> dict:
+    out: dict[str, Any] = {"http2": HTTP2 and h2 is not None}
+    for name, stats in _http_stats.items():
+        entry: dict[str, Any] = dict(stats)
+        client = _http_clients.get(name)
+        # httpx has no public pool API; peek at httpcore's pool, best effort.
+        pool = getattr(getattr(client, "_transport", None), "_pool", None)
+        try:
+            conns = list(pool.connections) if pool is not None else []
+            entry["connections"] = len(conns)
+            entry["idle"] = sum(1 for c in conns if c.is_idle())
+            entry["http2Connections"] = sum(1 for c in conns if "HTTP/2" in c.info())
+        except Exception:
+            pass
+        out[name] = entry
+    return out
+
 
 def _parse_bearer(auth_header: str) -> str:
     if not auth_header:
@@ -139,11 +279,10 @@ async def _openrouter_list_models(api_key: str) -> list[str]:
         "X-Title": "fud-buddy",
     }
 
-    async with httpx.AsyncClient(timeout=12.0) as client:
-        resp = await client.get(url, headers=headers)
-        if resp.status_code != 200:
-            return []
-        data = resp.json()
+    resp = await _http_client("openrouter").get(url, headers=headers, timeout=12.0)
+    if resp.status_code != 200:
+        return []
+    data = resp.json()
 
     items = data.get("data")
     if not isinstance(items, list):
@@ -274,18 +413,20 @@ def _check_rate_limit(request: Request) -> Optional[dict]:
     }
 
 
-async def _openrouter_stream(prompt: str):
+async def _openrouter_stream(prompt: str, *, api_key: str = "", model: str = ""):
     """Yield streamed delta text from OpenRouter."""
 
+    api_key = api_key or OPENROUTER_API_KEY
+    model = model or OPENROUTER_MODEL
     url = f"{OPENROUTER_BASE_URL.rstrip('/')}/chat/completions"
     headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+        "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json",
         "HTTP-Referer": "http://localhost",
         "X-Title": "fud-buddy",
     }
     body = {
-        "model": OPENROUTER_MODEL,
+        "model": model,
         "temperature": 0.6,
         "max_tokens": OPENROUTER_MAX_TOKENS,
         "stream": True,
@@ -298,358 +439,1647 @@ async def _openrouter_stream(prompt: str):
     }
 
     full = ""
-    async with httpx.AsyncClient(timeout=OPENROUTER_TIMEOUT_S) as client:
-        async with client.stream("POST", url, headers=headers, json=body) as resp:
-            if resp.status_code != 200:
+    async with _http_client("openrouter").stream(
+        "POST", url, headers=headers, json=body
+    ) as resp:
+        if resp.status_code != 200:
+            detail = ""
+            try:
+                body_bytes = await resp.aread()
+                detail = body_bytes.decode("utf-8", errors="replace")[:800]
+            except Exception:
                 detail = ""
-                try:
-                    body_bytes = await resp.aread()
-                    detail = body_bytes.decode("utf-8", errors="replace")[:800]
-                except Exception:
-                    detail = ""
-                raise RuntimeError(
-                    f"openrouter_error status={resp.status_code} model={OPENROUTER_MODEL} detail={detail}"
-                )
+            raise RuntimeError(
+                f"openrouter_error status={resp.status_code} model={model} detail={detail}"
+            )
 
-            async for line in resp.aiter_lines():
-                if not line or not line.startswith("data: "):
-                    continue
-                data = line[6:]
-                if data.strip() == "[DONE]":
-                    break
-                try:
-                    payload = json.loads(data)
-                except Exception:
-                    continue
+        async for line in resp.aiter_lines():
+            if not line or not line.startswith("data: "):
+                continue
+            data = line[6:]
+            if data.strip() == "[DONE]":
+                break
+            try:
+                payload = json.loads(data)
+            except Exception:
+                continue
 
-                try:
-                    delta = (
-                        (payload.get("choices") or [{}])[0]
-                        .get("delta", {})
-                        .get("content")
-                    )
-                except Exception:
-                    delta = None
+            try:
+                delta = (
+                    (payload.get("choices") or [{}])[0].get("delta", {}).get("content")
+                )
+            except Exception:
+                delta = None
 
-                if isinstance(delta, str) and delta:
-                    full += delta
-                    yield delta
+            if isinstance(delta, str) and delta:
+                full += delta
+                yield delta
 
     # No return: async generator
 
 
-async def _ollama_stream(prompt: str):
-    url = f"{OLLAMA_BASE_URL.rstrip('/')}/api/generate"
-    async with httpx.AsyncClient(timeout=180.0) as client:
-        async with client.stream(
-            "POST",
-            url,
-            json={
-                "model": OLLAMA_MODEL,
-                "prompt": prompt,
-                "stream": True,
-                "options": {
-                    "temperature": 0.5,
-                    "num_predict": 900,
-                },
-            },
-        ) as resp:
-            if resp.status_code != 200:
-                detail = ""
-                try:
-                    body = await resp.aread()
-                    detail = body.decode("utf-8", errors="replace")[:800]
-                except Exception:
-                    detail = ""
-                raise RuntimeError(
-                    f"ollama_error status={resp.status_code} model={OLLAMA_MODEL} detail={detail}"
-                )
+_ollama_stats: dict[str, Any] = {
+    "warmups": 0,
+    "warmupMs": None,
+    "pings": 0,
+    "coldStarts": 0,
+    "lastColdStartMs": None,
+    "lastLoadMs": None,
+}
+_ollama_last_used = 0.0
 
-            async for line in resp.aiter_lines():
-                if not line:
-                    continue
-                try:
-                    payload = json.loads(line)
-                except Exception:
-                    continue
-                token = payload.get("response")
-                if isinstance(token, str) and token:
-                    yield token
-                if payload.get("done"):
-                    break
 
+def _ollama_keep_alive() -> Any:
+    # Ollama takes a duration string ("30m") or seconds (-1 keeps it loaded).
+    ka = OLLAMA_KEEP_ALIVE
+    if re.match(r"^-?\d+$", ka):
+        return int(ka)
+    return ka or "5m"
 
-async def _llm_stream(prompt: str):
-    if OPENROUTER_API_KEY:
-        async for t in _openrouter_stream(prompt):
-            yield t
+
+def _note_ollama_load(payload: dict) -> None:
+    """Record model load time from a finished Ollama response."""
+
+    global _ollama_last_used
+    _ollama_last_used = time.time()
+    try:
+        load_ms = float(payload.get("load_duration") or 0) / 1e6
+    except Exception:
         return
+    _ollama_stats["lastLoadMs"] = round(load_ms, 1)
+    # A resident model reports a few ms; anything bigger was a real (re)load.
+    if load_ms >= 500:
+        _ollama_stats["coldStarts"] += 1
+        _ollama_stats["lastColdStartMs"] = round(load_ms, 1)
 
-    async for t in _ollama_stream(prompt):
-        yield t
 
+async def _ollama_ping(prompt: str = "") -> Optional[float]:
+    """Load (or keep) the model resident; returns elapsed ms or None on failure.
 
-async def _llm_generate(
-    prompt: str, *, openrouter_key: str = "", openrouter_model: str = ""
-) -> str:
-    """Generate text with either OpenRouter (if configured) or Ollama."""
+    A non-empty prompt also primes Ollama's prompt cache with that prefix.
+    """
 
-    if openrouter_key:
-        url = f"{OPENROUTER_BASE_URL.rstrip('/')}/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {openrouter_key}",
-            "Content-Type": "application/json",
-            # OpenRouter recommends these for attribution/rate-limiting hygiene.
-            "HTTP-Referer": "http://localhost",
-            "X-Title": "fud-buddy",
-        }
-        body = {
-            "model": openrouter_model or OPENROUTER_MODEL,
-            "temperature": 0.5,
-            "max_tokens": OPENROUTER_MAX_TOKENS,
-            "messages": [
-                {
-                    "role": "user",
-                    "content": prompt,
-                }
-            ],
-        }
+    body: dict[str, Any] = {
+        "model": OLLAMA_MODEL,
+        "prompt": prompt,
+        "stream": False,
+        "keep_alive": _ollama_keep_alive(),
+    }
+    if prompt:
+        body["options"] = {"num_predict": 1}
 
-        async with httpx.AsyncClient(timeout=OPENROUTER_TIMEOUT_S) as client:
-            resp = await client.post(url, headers=headers, json=body)
-            if resp.status_code != 200:
-                detail = resp.text[:1200]
-                suggestions: list[str] = []
-                try:
-                    if resp.status_code == 400 and "valid model" in detail.lower():
-                        all_models = await _openrouter_list_models(openrouter_key)
-                        q = str(body.get("model") or "")
-                        ql = q.lower()
-                        # Return a small set of close matches.
-                        suggestions = [
-                            m for m in all_models if ql.split("/")[-1] in m.lower()
-                        ][:12]
-                        if not suggestions:
-                            suggestions = [
-                                m
-                                for m in all_models
-                                if "gemini" in m.lower() and "flash" in m.lower()
-                            ][:12]
-                except Exception:
-                    suggestions = []
+    started = time.perf_counter()
+    try:
+        resp = await _http_client("ollama").post(
+            f"{OLLAMA_BASE_URL.rstrip('/')}/api/generate", json=body
+        )
+        if resp.status_code != 200:
+            return None
+        _note_ollama_load(resp.json())
+    except Exception:
+        return None
+    return round((time.perf_counter() - started) * 1000, 1)
 
-                raise RuntimeError(
-                    "openrouter_error "
-                    + json.dumps(
-                        {
-                            "status": resp.status_code,
-                            "model": body.get("model"),
-                            "detail": detail,
-                            "suggestions": suggestions,
-                        },
-                        ensure_ascii=True,
-                    )
-                )
 
-            data = resp.json()
-            choices = data.get("choices") or []
-            if not choices:
-                raise RuntimeError("openrouter_error: no choices")
+async def _ollama_warmup() -> None:
+    elapsed = await _ollama_ping(_RECOMMENDATION_INSTRUCTIONS)
+    if elapsed is not None:
+        _ollama_stats["warmups"] += 1
+        _ollama_stats["warmupMs"] = elapsed
 
-            msg = (choices[0] or {}).get("message") or {}
-            content = msg.get("content")
-            if not isinstance(content, str) or not content.strip():
-                raise RuntimeError("openrouter_error: empty content")
-            return content.strip()
 
-    # Default: Ollama
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        resp = await client.post(
-            f"{OLLAMA_BASE_URL.rstrip('/')}/api/generate",
-            json={
-                "model": OLLAMA_MODEL,
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "temperature": 0.5,
-                    "num_predict": 900,
-                },
-            },
-        )
+async def _ollama_keepwarm_loop() -> None:
+    while True:
+        await asyncio.sleep(OLLAMA_KEEPWARM_INTERVAL_S)
+        if time.time() - _ollama_last_used < OLLAMA_KEEPWARM_INTERVAL_S:
+            continue
+        if await _ollama_ping() is not None:
+            _ollama_stats["pings"] += 1
 
-    if resp.status_code != 200:
-        detail = ""
-        try:
-            detail = resp.text[:800]
-        except Exception:
-            detail = ""
-        raise RuntimeError(
-            f"ollama_error status={resp.status_code} model={OLLAMA_MODEL} detail={detail}"
-        )
 
-    payload = resp.json()
-    return str(payload.get("response") or "").strip()
+async def _ollama_stream(prompt: str):
+    url = f"{OLLAMA_BASE_URL.rstrip('/')}/api/generate"
+    async with _http_client("ollama").stream(
+        "POST",
+        url,
+        json={
+            "model": OLLAMA_MODEL,
+            "prompt": prompt,
+            "stream": True,
+            "options": {
+                "temperature": 0.5,
+                "num_predict": 900,
+            },
+            "keep_alive": _ollama_keep_alive(),
+        },
+    ) as resp:
+        if resp.status_code != 200:
+            detail = ""
+            try:
+                body = await resp.aread()
+                detail = body.decode("utf-8", errors="replace")[:800]
+            except Exception:
+                detail = ""
+            raise RuntimeError(
+                f"ollama_error status={resp.status_code} model={OLLAMA_MODEL} detail={detail}"
+            )
 
+        async for line in resp.aiter_lines():
+            if not line:
+                continue
+            try:
+                payload = json.loads(line)
+            except Exception:
+                continue
+            token = payload.get("response")
+            if isinstance(token, str) and token:
+                yield token
+            if payload.get("done"):
+                _note_ollama_load(payload)
+                break
 
-db_pool = None
 
+async def _llm_stream(
+    prompt: str, *, openrouter_key: str = "", openrouter_model: str = ""
+):
+    key = openrouter_key
+    provider, model = _llm_target(key, openrouter_model)
+    breaker = _llm_breaker(provider, model)
+    if not breaker.allow():
+        raise _LlmCircuitOpen(f"{provider}_unavailable: circuit open for {model}")
+
+    if key:
+        stream = _openrouter_stream(prompt, api_key=key, model=openrouter_model)
+    else:
+        stream = _ollama_stream(prompt)
+    started = time.perf_counter()
+    try:
+        async for t in stream:
+            yield t
+    except GeneratorExit:
+        # Callers close the stream once they have what they need.
+        breaker.success()
+        _record_llm_latency(provider, model, time.perf_counter() - started)
+        raise
+    except asyncio.CancelledError:
+        breaker.abandon()
+        raise
+    except Exception as e:
+        breaker.failure(e)
+        raise
+    else:
+        breaker.success()
+        _record_llm_latency(provider, model, time.perf_counter() - started)
+    finally:
+        await stream.aclose()
+
+
+async def _llm_stream_object(
+    prompt: str,
+    scanner: "_JsonObjectScanner",
+    *,
+    openrouter_key: str = "",
+    openrouter_model: str = "",
+):
+    """Feed streamed tokens into `scanner`, yielding (path, value) as fields complete.
+
+    The upstream stream is closed as soon as the object's closing brace arrives,
+    so we don't pay for trailing tokens.
+    """
 
-def _is_public_http_url(raw: str) -> bool:
-    """Basic SSRF guard for the image proxy."""
+    # `openrouter_key` is already routed ("" means Ollama): cache under the model
+    # that will actually answer.
+    provider, model = _llm_target(openrouter_key, openrouter_model)
+    key = _llm_cache_key(prompt, provider, model)
+    cached = _llm_cache_get(key)
+    if cached is not None:
+        for field in scanner.feed(cached):
+            yield field
+        return
 
+    stream = _llm_stream(
+        prompt, openrouter_key=openrouter_key, openrouter_model=openrouter_model
+    )
     try:
-        u = urlparse(raw)
-    except Exception:
-        return False
-    if u.scheme not in ("http", "https"):
-        return False
-    if not u.hostname:
-        return False
+        async for token in stream:
+            for field in scanner.feed(token):
+                yield field
+            if scanner.done:
+                break
+    finally:
+        await stream.aclose()
+
+    if scanner.done:
+        _llm_cache_put(key, scanner.text)
+
+
+async def _llm_stream_objects(
+    prompt: str,
+    count: int,
+    *,
+    openrouter_key: str = "",
+    openrouter_model: str = "",
+):
+    """Yield up to `count` JSON object substrings from one streamed completion.
+
+    Objects are popped off the growing buffer with `_pop_first_json_object`; the
+    upstream stream is closed once `count` objects have arrived.
+    """
 
-    host = u.hostname
-    if host in ("localhost",):
-        return False
+    # `openrouter_key` is already routed ("" means Ollama): cache under the model
+    # that will actually answer.
+    provider, model = _llm_target(openrouter_key, openrouter_model)
+    key = _llm_cache_key(prompt, provider, model)
+    cached = _llm_cache_get(key)
+    if cached is not None:
+        buf = cached
+        for _ in range(count):
+            obj_text, buf = _pop_first_json_object(buf)
+            if obj_text is None:
+                break
+            yield obj_text
+        return
 
+    got: list[str] = []
+    buf = ""
+    stream = _llm_stream(
+        prompt, openrouter_key=openrouter_key, openrouter_model=openrouter_model
+    )
     try:
-        ip = ipaddress.ip_address(host)
-    except Exception:
-        # Not an IP; allow (DNS-level SSRF is still possible but this is a simple dev proxy).
-        return True
+        async for token in stream:
+            buf += token
+            if "}" not in token:
+                continue
+            while len(got) < count:
+                obj_text, buf = _pop_first_json_object(buf)
+                if obj_text is None:
+                    break
+                got.append(obj_text)
+                yield obj_text
+            if len(got) >= count:
+                break
+    finally:
+        await stream.aclose()
 
-    if (
-        ip.is_private
-        or ip.is_loopback
-        or ip.is_link_local
-        or ip.is_multicast
-        or ip.is_reserved
-    ):
-        return False
-    return True
+    if len(got) == count:
+        # Stored as an array so the cache's JSON check accepts it.
+        _llm_cache_put(key, "[" + ",\n".join(got) + "]")
 
 
-@app.get("/api/image-proxy")
-async def image_proxy(url: str):
-    """Fetch a remote image and return it with permissive CORS.
+_MERGE_DONE = object()
 
-    Used for share card rendering (canvas) where direct cross-origin images taint the canvas.
+
+async def _merge_async_iters(iters: dict):
+    """Yield (key, item) from several async iterators as items arrive.
+
+    The first exception from any iterator is re-raised; the rest are cancelled.
     """
 
-    if not _is_public_http_url(url):
-        raise HTTPException(status_code=400, detail="Invalid url")
+    queue: asyncio.Queue = asyncio.Queue()
 
-    headers = {
-        "Accept": "image/*",
-        "User-Agent": "fud-buddy-dev/1.0",
-    }
+    async def _drain(key: Any, it: Any) -> None:
+        try:
+            async for item in it:
+                await queue.put((key, item, None))
+            await queue.put((key, _MERGE_DONE, None))
+        except Exception as e:
+            await queue.put((key, _MERGE_DONE, e))
 
-    max_bytes = 5_000_000
-    async with httpx.AsyncClient(timeout=10.0, follow_redirects=True) as client:
-        resp = await client.get(url, headers=headers)
-        if resp.status_code != 200:
-            raise HTTPException(status_code=502, detail="Upstream fetch failed")
-        content_type = resp.headers.get("content-type", "image/jpeg")
-        data = resp.content
+    tasks = [asyncio.create_task(_drain(k, it)) for k, it in iters.items()]
+    remaining = len(tasks)
+    try:
+        while remaining:
+            key, item, err = await queue.get()
+            if err is not None:
+                raise err
+            if item is _MERGE_DONE:
+                remaining -= 1
+                continue
+            yield key, item
+    finally:
+        for t in tasks:
+            t.cancel()
 
-    if len(data) > max_bytes:
-        raise HTTPException(status_code=413, detail="Image too large")
 
-    return Response(
-        content=data,
-        media_type=content_type,
-        headers={
-            "Access-Control-Allow-Origin": "*",
-            "Cache-Control": "public, max-age=86400",
-        },
-    )
+# Prompt-keyed LLM response cache (in-process LRU with TTL).
+LLM_CACHE_TTL_S = _env_float("LLM_CACHE_TTL_S", 3600.0)
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "256"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", "4000000"))
 
+_llm_cache: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+_llm_cache_bytes = 0
+_llm_cache_stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
 
-@app.get("/api/geocode/reverse")
-async def reverse_geocode(lat: float, lon: float):
-    """Reverse geocode lat/lon into a human-friendly place.
 
-    This is intentionally best-effort (no keys required) and returns a short display string.
-    """
+def _llm_target(
+    openrouter_key: str = "", openrouter_model: str = ""
+) -> tuple[str, str]:
+    """Return (provider, model) a prompt will be sent to."""
 
-    url = "https://nominatim.openstreetmap.org/reverse"
-    params = {
-        "format": "jsonv2",
-        "lat": str(lat),
-        "lon": str(lon),
-    }
-    headers = {
-        "Accept": "application/json",
-        # Nominatim policy prefers identifiable UA; keep it generic and non-personal.
-        "User-Agent": "fud-buddy-dev/1.0",
-        "Accept-Language": "en",
-    }
+    if openrouter_key:
+        return "openrouter", openrouter_model or OPENROUTER_MODEL
+    return "ollama", OLLAMA_MODEL
 
-    try:
-        async with httpx.AsyncClient(timeout=8.0, follow_redirects=True) as client:
-            resp = await client.get(url, params=params, headers=headers)
-            if resp.status_code != 200:
-                return {"ok": False, "display": "", "status": resp.status_code}
-
-            data = resp.json()
-            addr = data.get("address") or {}
-            if not isinstance(addr, dict):
-                addr = {}
-
-            city = (
-                addr.get("city")
-                or addr.get("town")
-                or addr.get("village")
-                or addr.get("hamlet")
-                or addr.get("county")
-                or ""
-            )
-            state = (
-                addr.get("state")
-                or addr.get("region")
-                or addr.get("state_district")
-                or ""
-            )
 
-            if isinstance(city, str) and isinstance(state, str) and city and state:
-                return {"ok": True, "display": f"{city}, {state}"}
-            if isinstance(city, str) and city:
-                return {"ok": True, "display": city}
+def _llm_cache_key(prompt: str, provider: str, model: str) -> str:
+    # Normalize whitespace/case so cosmetic prompt differences still hit.
+    norm = re.sub(r"\s+", " ", prompt or "").strip().lower()
+    raw = f"{provider}\n{model}\n{norm}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
 
-            display_name = data.get("display_name")
-            if isinstance(display_name, str) and display_name:
-                short = ", ".join(
-                    [p.strip() for p in display_name.split(",")[:3] if p.strip()]
-                )
-                return {"ok": True, "display": short}
 
-            return {"ok": False, "display": ""}
-    except Exception as e:
-        return {"ok": False, "display": "", "error": str(e)}
+def _llm_cache_get(key: str) -> Optional[str]:
+    if LLM_CACHE_TTL_S <= 0:
+        return None
 
+    hit = _llm_cache.get(key)
+    if hit is None:
+        _llm_cache_stats["misses"] += 1
+        return None
 
-@app.get("/api/loader/images")
-async def loader_images(location: str = "", vibe: str = ""):
-    """Return a few food photo URLs for the loading screen.
+    stored_at, text = hit
+    if time.time() - stored_at > LLM_CACHE_TTL_S:
+        _llm_cache_drop(key)
+        _llm_cache_stats["expired"] += 1
+        _llm_cache_stats["misses"] += 1
+        return None
 
-    This is best-effort and intentionally lightweight.
-    """
+    _llm_cache.move_to_end(key)
+    _llm_cache_stats["hits"] += 1
+    return text
 
-    loc = (location or "").strip()
-    vb = (vibe or "").strip().replace("-", " ")
-    if _looks_like_coords(loc):
-        loc = "nearby"
 
-    parts = ["food", "dish", "photo"]
-    if vb:
-        parts.insert(1, vb)
-    if loc and loc.lower() not in ("near me", "near you"):
-        parts.insert(1, loc)
-    q = " ".join([p for p in parts if p])
+def _llm_cache_drop(key: str) -> None:
+    global _llm_cache_bytes
+    hit = _llm_cache.pop(key, None)
+    if hit is not None:
+        _llm_cache_bytes -= len(hit[1].encode("utf-8"))
 
-    try:
-        async with httpx.AsyncClient(timeout=10.0, follow_redirects=True) as client:
-            items = await search_images(q, client=client)
-    except Exception:
-        items = []
+
+def _llm_cache_put(key: str, text: str) -> None:
+    global _llm_cache_bytes
+    if LLM_CACHE_TTL_S <= 0 or not text:
+        return
+    # Only keep outputs we could actually use; replaying junk for an hour is worse
+    # than a miss.
+    if _extract_json_value(text) is None:
+        return
+
+    size = len(text.encode("utf-8"))
+    if size > LLM_CACHE_MAX_BYTES:
+        return
+
+    _llm_cache_drop(key)
+    _llm_cache[key] = (time.time(), text)
+    _llm_cache_bytes += size
+    while _llm_cache and (
+        len(_llm_cache) > LLM_CACHE_MAX_ENTRIES
+        or _llm_cache_bytes > LLM_CACHE_MAX_BYTES
+    ):
+        oldest = next(iter(_llm_cache))
+        _llm_cache_drop(oldest)
+        _llm_cache_stats["evictions"] += 1
+
+
+def _llm_cache_info() -> dict:
+    return {
+        **_llm_cache_stats,
+        "entries": len(_llm_cache),
+        "bytes": _llm_cache_bytes,
+        "ttlSeconds": LLM_CACHE_TTL_S,
+    }
+
+
+# Hedged requests: when both OpenRouter and Ollama are available, send the prompt
+# to the secondary if the primary hasn't answered within its recent p95 latency.
+LLM_HEDGE = os.getenv("LLM_HEDGE", "0") == "1"
+LLM_HEDGE_PRIMARY = os.getenv("LLM_HEDGE_PRIMARY", "openrouter").strip().lower()
+LLM_HEDGE_PERCENTILE = _env_float("LLM_HEDGE_PERCENTILE", 0.95)
+LLM_HEDGE_DELAY_S = _env_float("LLM_HEDGE_DELAY_S", 8.0)
+LLM_HEDGE_MIN_DELAY_S = _env_float("LLM_HEDGE_MIN_DELAY_S", 1.0)
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "10"))
+
+# Rolling latencies of successful calls, per (provider, model).
+_llm_latencies: dict[tuple[str, str], "deque[float]"] = {}
+_llm_hedge_stats = {
+    "hedged": 0,
+    "primaryWins": 0,
+    "secondaryWins": 0,
+    "ollamaBusy": 0,
+}
+
+
+def _record_llm_latency(provider: str, model: str, seconds: float) -> None:
+    samples = _llm_latencies.get((provider, model))
+    if samples is None:
+        samples = deque(maxlen=100)
+        _llm_latencies[(provider, model)] = samples
+    samples.append(seconds)
+
+
+def _llm_latency_percentile(provider: str, model: str, q: float) -> Optional[float]:
+    samples = _llm_latencies.get((provider, model))
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))
+    return ordered[idx]
+
+
+def _llm_hedge_delay(provider: str, model: str) -> float:
+    samples = _llm_latencies.get((provider, model)) or ()
+    if len(samples) < LLM_HEDGE_MIN_SAMPLES:
+        return LLM_HEDGE_DELAY_S
+    p = _llm_latency_percentile(provider, model, LLM_HEDGE_PERCENTILE)
+    return max(LLM_HEDGE_MIN_DELAY_S, p if p is not None else LLM_HEDGE_DELAY_S)
+
+
+def _llm_hedge_info() -> dict:
+    return {
+        **_llm_hedge_stats,
+        "enabled": LLM_HEDGE,
+        "primary": LLM_HEDGE_PRIMARY,
+        "delaySeconds": {
+            f"{p}:{m}": round(_llm_hedge_delay(p, m), 3) for (p, m) in _llm_latencies
+        },
+    }
+
+
+# Per-(provider, model) circuit breaker: after repeated failures calls fail fast
+# (or fail over to Ollama) until a half-open probe succeeds again.
+LLM_BREAKER = os.getenv("LLM_BREAKER", "1") == "1"
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "3"))
+LLM_BREAKER_ERROR_RATE = _env_float("LLM_BREAKER_ERROR_RATE", 0.5)
+LLM_BREAKER_WINDOW = int(os.getenv("LLM_BREAKER_WINDOW", "20"))
+LLM_BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "6"))
+LLM_BREAKER_OPEN_S = _env_float("LLM_BREAKER_OPEN_S", 30.0)
+LLM_BREAKER_FAILOVER = os.getenv("LLM_BREAKER_FAILOVER", "1") == "1"
+
+
+class _LlmCircuitOpen(RuntimeError):
+    pass
+
+
+class _CircuitBreaker:
+    """closed -> open after failures; open -> half-open after a cool-off, where
+    a single probe call decides whether to close again or re-open."""
+
+    def __init__(self) -> None:
+        self.state = "closed"
+        self.outcomes: deque[bool] = deque(maxlen=max(1, LLM_BREAKER_WINDOW))
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.stats = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0}
+        self.last_error = ""
+
+    def allow(self) -> bool:
+        if not LLM_BREAKER or self.state == "closed":
+            return True
+        if self.state == "open":
+            if time.time() - self.opened_at < LLM_BREAKER_OPEN_S:
+                self.stats["rejected"] += 1
+                return False
+            self.state = "half_open"
+        if self.probing:
+            self.stats["rejected"] += 1
+            return False
+        self.probing = True
+        return True
+
+    def abandon(self) -> None:
+        # The call was cancelled (e.g. lost a hedge race): no verdict either way.
+        self.probing = False
+
+    def success(self) -> None:
+        self.stats["calls"] += 1
+        self.outcomes.append(True)
+        self.consecutive_failures = 0
+        self.probing = False
+        if self.state != "closed":
+            self.state = "closed"
+            self.outcomes.clear()
+
+    def failure(self, err: BaseException) -> None:
+        self.stats["calls"] += 1
+        self.stats["failures"] += 1
+        self.outcomes.append(False)
+        self.consecutive_failures += 1
+        self.probing = False
+        self.last_error = str(err)[:200]
+        if self.state == "half_open" or self.consecutive_failures >= max(
+            1, LLM_BREAKER_FAILURES
+        ):
+            self._trip()
+        elif (
+            len(self.outcomes) >= LLM_BREAKER_MIN_CALLS
+            and self.error_rate() >= LLM_BREAKER_ERROR_RATE
+        ):
+            self._trip()
+
+    def _trip(self) -> None:
+        if self.state != "open":
+            self.stats["opened"] += 1
+        self.state = "open"
+        self.opened_at = time.time()
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return sum(1 for ok in self.outcomes if not ok) / len(self.outcomes)
+
+    def info(self, provider: str, model: str) -> dict:
+        def _pct(q: float) -> Optional[float]:
+            p = _llm_latency_percentile(provider, model, q)
+            return round(p, 3) if p is not None else None
+
+        retry_in = None
+        if self.state == "open":
+            retry_in = round(
+                max(0.0, LLM_BREAKER_OPEN_S - (time.time() - self.opened_at)), 1
+            )
+        return {
+            **self.stats,
+            "state": self.state,
+            "errorRate": round(self.error_rate(), 3),
+            "p50Seconds": _pct(0.5),
+            "p95Seconds": _pct(0.95),
+            "retryInSeconds": retry_in,
+            "lastError": self.last_error,
+        }
+
+
+_llm_breakers: dict[tuple[str, str], _CircuitBreaker] = {}
+_llm_breaker_stats = {"failovers": 0}
+
+
+def _llm_breaker(provider: str, model: str) -> _CircuitBreaker:
+    b = _llm_breakers.get((provider, model))
+    if b is None:
+        b = _CircuitBreaker()
+        _llm_breakers[(provider, model)] = b
+    return b
+
+
+def _llm_circuit_open(provider: str, model: str) -> bool:
+    """True while calls to (provider, model) would be rejected."""
+
+    b = _llm_breakers.get((provider, model))
+    if b is None or not LLM_BREAKER:
+        return False
+    if b.state == "open":
+        return time.time() - b.opened_at < LLM_BREAKER_OPEN_S
+    return b.state == "half_open" and b.probing
+
+
+def _llm_use_failover(openrouter_key: str, openrouter_model: str) -> bool:
+    """True when an OpenRouter call should go to the local model instead.
+
+    Only OpenRouter fails over; there's nothing behind Ollama to fall back to.
+    """
+
+    if not (LLM_BREAKER_FAILOVER and openrouter_key):
+        return False
+    provider, model = _llm_target(openrouter_key, openrouter_model)
+    return _llm_circuit_open(provider, model) and not _llm_circuit_open(
+        "ollama", OLLAMA_MODEL
+    )
+
+
+def _llm_route(openrouter_key: str, openrouter_model: str = "") -> str:
+    """Return the OpenRouter key to actually call with ("" means Ollama)."""
+
+    if _llm_use_failover(openrouter_key, openrouter_model):
+        _llm_breaker_stats["failovers"] += 1
+        return ""
+    return openrouter_key
+
+
+def _llm_breaker_info() -> dict:
+    return {
+        **_llm_breaker_stats,
+        "enabled": LLM_BREAKER,
+        "providers": {f"{p}:{m}": b.info(p, m) for (p, m), b in _llm_breakers.items()},
+    }
+
+
+async def _llm_generate_timed(
+    prompt: str, *, openrouter_key: str = "", openrouter_model: str = ""
+) -> str:
+    provider, model = _llm_target(openrouter_key, openrouter_model)
+    breaker = _llm_breaker(provider, model)
+    if not breaker.allow():
+        raise _LlmCircuitOpen(f"{provider}_unavailable: circuit open for {model}")
+
+    started = time.perf_counter()
+    try:
+        text = await _llm_generate_upstream(
+            prompt, openrouter_key=openrouter_key, openrouter_model=openrouter_model
+        )
+    except asyncio.CancelledError:
+        breaker.abandon()
+        raise
+    except Exception as e:
+        breaker.failure(e)
+        raise
+    breaker.success()
+    _record_llm_latency(provider, model, time.perf_counter() - started)
+    return text
+
+
+async def _llm_generate_hedged(
+    prompt: str, *, openrouter_key: str, openrouter_model: str = ""
+) -> tuple[str, str]:
+    """Race OpenRouter and Ollama: the secondary starts once the primary is late.
+
+    The first answer containing valid JSON wins; the other call is cancelled.
+    Returns `(text, provider)` for the winner. The Ollama leg only runs if the
+    local scheduler has a free slot right now: a hedge never queues behind, or
+    crowds out, admitted local requests.
+    """
+
+    async def _call(provider: str, ticket: Optional[dict]) -> str:
+        key = openrouter_key if provider == "openrouter" else ""
+        try:
+            text = await _llm_generate_timed(
+                prompt, openrouter_key=key, openrouter_model=openrouter_model
+            )
+        finally:
+            _llm_scheduler.release(ticket)
+        if _extract_json_value(text) is None:
+            raise RuntimeError(f"{provider}_error: invalid JSON")
+        return text
+
+    def _start(provider: str) -> Optional[asyncio.Task]:
+        ticket = None
+        if provider == "ollama":
+            ticket = _llm_scheduler.try_acquire()
+            if ticket is None:
+                _llm_hedge_stats["ollamaBusy"] += 1
+                return None
+        task = asyncio.create_task(_call(provider, ticket))
+        legs[task] = provider
+        return task
+
+    primary = "ollama" if LLM_HEDGE_PRIMARY == "ollama" else "openrouter"
+    secondary = "openrouter" if primary == "ollama" else "ollama"
+    p_model = _llm_target(
+        openrouter_key if primary == "openrouter" else "", openrouter_model
+    )[1]
+
+    legs: dict[asyncio.Task, str] = {}
+    last_err: Optional[BaseException] = None
+    try:
+        primary_task = _start(primary)
+        if primary_task is not None:
+            done, _ = await asyncio.wait(
+                {primary_task}, timeout=_llm_hedge_delay(primary, p_model)
+            )
+            if primary_task in done:
+                last_err = primary_task.exception()
+                if last_err is None:
+                    _llm_hedge_stats["primaryWins"] += 1
+                    return primary_task.result(), primary
+
+        if _start(secondary) is not None and primary_task is not None:
+            _llm_hedge_stats["hedged"] += 1
+        pending = {t for t in legs if not t.done()}
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for t in done:
+                err = t.exception()
+                if err is None:
+                    provider = legs[t]
+                    _llm_hedge_stats[
+                        "primaryWins" if provider == primary else "secondaryWins"
+                    ] += 1
+                    return t.result(), provider
+                last_err = err
+    finally:
+        for t in legs:
+            if not t.done():
+                t.cancel()
+
+    raise last_err or RuntimeError("llm_error: hedged calls failed")
+
+
+async def _llm_generate(
+    prompt: str, *, openrouter_key: str = "", openrouter_model: str = ""
+) -> str:
+    """Generate text, answering repeat prompts from the response cache.
+
+    `openrouter_key` is the already-routed key (see `_llm_route`); "" means Ollama.
+    """
+
+    provider, model = _llm_target(openrouter_key, openrouter_model)
+    key = _llm_cache_key(prompt, provider, model)
+    cached = _llm_cache_get(key)
+    if cached is not None:
+        return cached
+
+    if LLM_HEDGE and openrouter_key:
+        text, winner = await _llm_generate_hedged(
+            prompt, openrouter_key=openrouter_key, openrouter_model=openrouter_model
+        )
+        if winner == "ollama":
+            # Cache under the model that actually wrote the answer.
+            key = _llm_cache_key(prompt, *_llm_target("", openrouter_model))
+    else:
+        text = await _llm_generate_timed(
+            prompt, openrouter_key=openrouter_key, openrouter_model=openrouter_model
+        )
+    _llm_cache_put(key, text)
+    return text
+
+
+async def _llm_generate_upstream(
+    prompt: str, *, openrouter_key: str = "", openrouter_model: str = ""
+) -> str:
+    """Generate text with either OpenRouter (if configured) or Ollama."""
+
+    if openrouter_key:
+        url = f"{OPENROUTER_BASE_URL.rstrip('/')}/chat/completions"
+        headers = {
+            "Authorization": f"Bearer {openrouter_key}",
+            "Content-Type": "application/json",
+            # OpenRouter recommends these for attribution/rate-limiting hygiene.
+            "HTTP-Referer": "http://localhost",
+            "X-Title": "fud-buddy",
+        }
+        body = {
+            "model": openrouter_model or OPENROUTER_MODEL,
+            "temperature": 0.5,
+            "max_tokens": OPENROUTER_MAX_TOKENS,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt,
+                }
+            ],
+        }
+
+        resp = await _http_client("openrouter").post(url, headers=headers, json=body)
+        if resp.status_code != 200:
+            detail = resp.text[:1200]
+            suggestions: list[str] = []
+            try:
+                if resp.status_code == 400 and "valid model" in detail.lower():
+                    all_models = await _openrouter_list_models(openrouter_key)
+                    q = str(body.get("model") or "")
+                    ql = q.lower()
+                    # Return a small set of close matches.
+                    suggestions = [
+                        m for m in all_models if ql.split("/")[-1] in m.lower()
+                    ][:12]
+                    if not suggestions:
+                        suggestions = [
+                            m
+                            for m in all_models
+                            if "gemini" in m.lower() and "flash" in m.lower()
+                        ][:12]
+            except Exception:
+                suggestions = []
+
+            raise RuntimeError(
+                "openrouter_error "
+                + json.dumps(
+                    {
+                        "status": resp.status_code,
+                        "model": body.get("model"),
+                        "detail": detail,
+                        "suggestions": suggestions,
+                    },
+                    ensure_ascii=True,
+                )
+            )
+
+        data = resp.json()
+        choices = data.get("choices") or []
+        if not choices:
+            raise RuntimeError("openrouter_error: no choices")
+
+        msg = (choices[0] or {}).get("message") or {}
+        content = msg.get("content")
+        if not isinstance(content, str) or not content.strip():
+            raise RuntimeError("openrouter_error: empty content")
+        return content.strip()
+
+    # Default: Ollama
+    resp = await _http_client("ollama").post(
+        f"{OLLAMA_BASE_URL.rstrip('/')}/api/generate",
+        timeout=120.0,
+        json={
+            "model": OLLAMA_MODEL,
+            "prompt": prompt,
+            "stream": False,
+            "options": {
+                "temperature": 0.5,
+                "num_predict": 900,
+            },
+            "keep_alive": _ollama_keep_alive(),
+        },
+    )
+
+    if resp.status_code != 200:
+        detail = ""
+        try:
+            detail = resp.text[:800]
+        except Exception:
+            detail = ""
+        raise RuntimeError(
+            f"ollama_error status={resp.status_code} model={OLLAMA_MODEL} detail={detail}"
+        )
+
+    payload = resp.json()
+    _note_ollama_load(payload)
+    return str(payload.get("response") or "").strip()
+
+
+DATABASE_URL = os.getenv("DATABASE_URL", "")
+
+db_pool = None
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _is_public_http_url(raw: str) -> bool:
+    """Basic SSRF guard for the image proxy."""
+
+    try:
+        u = urlparse(raw)
+    except Exception:
+        return False
+    if u.scheme not in ("http", "https"):
+        return False
+    if not u.hostname:
+        return False
+
+    host = u.hostname
+    if host in ("localhost",):
+        return False
+
+    try:
+        ip = ipaddress.ip_address(host)
+    except Exception:
+        # Not an IP; allow (DNS-level SSRF is still possible but this is a simple dev proxy).
+        return True
+
+    if (
+        ip.is_private
+        or ip.is_loopback
+        or ip.is_link_local
+        or ip.is_multicast
+        or ip.is_reserved
+    ):
+        return False
+    return True
+
+
+# Image proxy cache: bodies are stored on disk by content hash (blobs/<sha256>),
+# with a small JSON record per URL (urls/<sha256(url)>.json) holding the upstream
+# validators. Stale entries are revalidated with If-None-Match/If-Modified-Since;
+# the oldest blobs are evicted once the directory passes IMAGE_PROXY_CACHE_MAX_BYTES.
+IMAGE_PROXY_MAX_BYTES = int(os.getenv("IMAGE_PROXY_MAX_BYTES", "5000000"))
+IMAGE_PROXY_CACHE_DIR = os.getenv(
+    "IMAGE_PROXY_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "fud-buddy-image-cache"),
+).strip()
+IMAGE_PROXY_CACHE_MAX_BYTES = int(
+    os.getenv("IMAGE_PROXY_CACHE_MAX_BYTES", str(256 * 1024 * 1024))
+)
+IMAGE_PROXY_CACHE_TTL_S = _env_float("IMAGE_PROXY_CACHE_TTL_S", 86400.0)
+
+_image_proxy_stats = {
+    "hits": 0,
+    "revalidated": 0,
+    "misses": 0,
+    "notModified": 0,
+    "staleServed": 0,
+    "dropped": 0,
+    "tooLarge": 0,
+    "evictedBytes": 0,
+    "recordsSwept": 0,
+}
+_image_cache_bytes: Optional[int] = None  # lazily measured on first write
+_image_cache_lock = threading.Lock()
+
+
+class _ImageTooLarge(Exception):
+    pass
+
+
+def _image_url_record_path(url: str) -> str:
+    digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return os.path.join(IMAGE_PROXY_CACHE_DIR, "urls", f"{digest}.json")
+
+
+def _image_blob_path(sha: str) -> str:
+    return os.path.join(IMAGE_PROXY_CACHE_DIR, "blobs", sha)
+
+
+def _image_cache_read(url: str) -> Optional[dict]:
+    try:
+        with open(_image_url_record_path(url), "r", encoding="utf-8") as f:
+            rec = json.load(f)
+    except Exception:
+        return None
+    if not isinstance(rec, dict) or not os.path.exists(
+        _image_blob_path(str(rec.get("sha") or ""))
+    ):
+        return None
+    return rec
+
+
+def _image_cache_write_record(url: str, rec: dict) -> None:
+    path = _image_url_record_path(url)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(rec, f)
+    os.replace(tmp, path)
+
+
+def _image_cache_commit(tmp_path: str, sha: str, size: int) -> None:
+    """Move a downloaded body into place, then evict down to the byte cap."""
+
+    global _image_cache_bytes
+    blob = _image_blob_path(sha)
+    with _image_cache_lock:
+        if os.path.exists(blob):
+            os.remove(tmp_path)  # same bytes already cached under another URL
+            os.utime(blob)
+            return
+        os.replace(tmp_path, blob)
+        if _image_cache_bytes is None:
+            blobs_dir = os.path.dirname(blob)
+            _image_cache_bytes = sum(
+                e.stat().st_size
+                for e in os.scandir(blobs_dir)
+                if e.is_file() and not e.name.startswith(".")
+            )
+        else:
+            _image_cache_bytes += size
+        if _image_cache_bytes <= IMAGE_PROXY_CACHE_MAX_BYTES:
+            return
+
+        # Other workers write here too: re-measure, then drop the least recently
+        # served blobs (hits touch the blob's mtime).
+        entries = sorted(
+            (
+                e
+                for e in os.scandir(os.path.dirname(blob))
+                if e.is_file() and not e.name.startswith(".")  # skip downloads
+            ),
+            key=lambda e: e.stat().st_mtime,
+        )
+        _image_cache_bytes = sum(e.stat().st_size for e in entries)
+        for e in entries:
+            if _image_cache_bytes <= IMAGE_PROXY_CACHE_MAX_BYTES * 0.9:
+                break
+            if e.path == blob:
+                continue
+            try:
+                freed = e.stat().st_size
+                os.remove(e.path)
+            except OSError:
+                continue
+            _image_cache_bytes -= freed
+            _image_proxy_stats["evictedBytes"] += freed
+        _image_sweep_records()
+
+
+def _image_sweep_records() -> None:
+    """Drop URL records whose blob is gone. Caller holds _image_cache_lock."""
+
+    urls_dir = os.path.join(IMAGE_PROXY_CACHE_DIR, "urls")
+    try:
+        entries = list(os.scandir(urls_dir))
+    except OSError:
+        return
+    for e in entries:
+        if not e.name.endswith(".json"):
+            continue  # in-progress writes
+        try:
+            with open(e.path, "r", encoding="utf-8") as f:
+                sha = str(json.load(f).get("sha") or "")
+        except Exception:
+            sha = ""
+        if sha and os.path.exists(_image_blob_path(sha)):
+            continue
+        try:
+            os.remove(e.path)
+        except OSError:
+            continue
+        _image_proxy_stats["recordsSwept"] += 1
+
+
+async def _image_proxy_fetch(
+    url: str, headers: dict
+) -> tuple[int, dict, str, str, int]:
+    """Stream an upstream image to a temp file, enforcing IMAGE_PROXY_MAX_BYTES.
+
+    Returns (status, response headers, temp path, sha256, size); the temp path is
+    empty unless status is 200.
+    """
+
+    os.makedirs(os.path.join(IMAGE_PROXY_CACHE_DIR, "blobs"), exist_ok=True)
+    async with _http_client("web").stream("GET", url, headers=headers) as resp:
+        if resp.status_code != 200:
+            return resp.status_code, dict(resp.headers), "", "", 0
+        declared = resp.headers.get("content-length", "")
+        if declared.isdigit() and int(declared) > IMAGE_PROXY_MAX_BYTES:
+            raise _ImageTooLarge()
+
+        tmp = os.path.join(IMAGE_PROXY_CACHE_DIR, "blobs", f".{uuid.uuid4().hex}.part")
+        digest = hashlib.sha256()
+        size = 0
+        f = await asyncio.to_thread(open, tmp, "wb")
+        try:
+            try:
+                async for chunk in resp.aiter_bytes():
+                    size += len(chunk)
+                    if size > IMAGE_PROXY_MAX_BYTES:
+                        raise _ImageTooLarge()
+                    digest.update(chunk)
+                    await asyncio.to_thread(f.write, chunk)
+            finally:
+                await asyncio.to_thread(f.close)
+        except BaseException:
+            try:
+                await asyncio.to_thread(os.remove, tmp)
+            except OSError:
+                pass
+            raise
+        return 200, dict(resp.headers), tmp, digest.hexdigest(), size
+
+
+async def _image_proxy_fetch_bytes(url: str, headers: dict) -> tuple[bytes, str]:
+    """Uncached path (IMAGE_PROXY_CACHE_DIR empty): stream into memory with the cap."""
+
+    async with _http_client("web").stream("GET", url, headers=headers) as resp:
+        if resp.status_code != 200:
+            raise HTTPException(status_code=502, detail="Upstream fetch failed")
+        declared = resp.headers.get("content-length", "")
+        if declared.isdigit() and int(declared) > IMAGE_PROXY_MAX_BYTES:
+            raise _ImageTooLarge()
+        buf = bytearray()
+        async for chunk in resp.aiter_bytes():
+            buf += chunk
+            if len(buf) > IMAGE_PROXY_MAX_BYTES:
+                raise _ImageTooLarge()
+        return bytes(buf), resp.headers.get("content-type", "image/jpeg")
+
+
+async def _image_proxy_refresh(url: str, headers: dict, rec: Optional[dict]) -> dict:
+    """Fetch (or revalidate `rec`) upstream and update the URL record.
+
+    Raises HTTPException when there is nothing servable.
+    """
+
+    conditional = dict(headers)
+    if rec is not None:
+        if rec.get("etag"):
+            conditional["If-None-Match"] = rec["etag"]
+        if rec.get("lastModified"):
+            conditional["If-Modified-Since"] = rec["lastModified"]
+    try:
+        status, up_headers, tmp, sha, size = await _image_proxy_fetch(url, conditional)
+    except _ImageTooLarge:
+        _image_proxy_stats["tooLarge"] += 1
+        raise HTTPException(status_code=413, detail="Image too large")
+    except httpx.HTTPError:
+        status, up_headers, tmp, sha, size = 0, {}, "", "", 0
+
+    if status == 304 and rec is not None:
+        _image_proxy_stats["revalidated"] += 1
+        rec["storedAt"] = time.time()
+    elif status == 200:
+        _image_proxy_stats["misses"] += 1
+        await asyncio.to_thread(_image_cache_commit, tmp, sha, size)
+        rec = {
+            "sha": sha,
+            "size": size,
+            "contentType": up_headers.get("content-type", "image/jpeg"),
+            "etag": up_headers.get("etag", ""),
+            "lastModified": up_headers.get("last-modified", ""),
+            "storedAt": time.time(),
+        }
+    elif rec is not None and (status == 0 or status >= 500):
+        # Upstream unavailable; serve the stale copy.
+        _image_proxy_stats["staleServed"] += 1
+    else:
+        # Gone, forbidden, or nothing cached: stop serving the old copy.
+        if rec is not None:
+            _image_proxy_stats["dropped"] += 1
+            try:
+                await asyncio.to_thread(os.remove, _image_url_record_path(url))
+            except OSError:
+                pass
+        raise HTTPException(status_code=502, detail="Upstream fetch failed")
+    try:
+        await asyncio.to_thread(_image_cache_write_record, url, rec)
+    except OSError:
+        pass
+    return rec
+
+
+@app.get("/api/image-proxy")
+async def image_proxy(url: str, request: Request):
+    """Fetch a remote image and return it with permissive CORS.
+
+    Used for share card rendering (canvas) where direct cross-origin images taint the canvas.
+    Cached on disk; hits are served straight from the file (Range supported).
+    """
+
+    if not _is_public_http_url(url):
+        raise HTTPException(status_code=400, detail="Invalid url")
+
+    headers = {
+        "Accept": "image/*",
+        "User-Agent": "fud-buddy-dev/1.0",
+    }
+    cors = {
+        "Access-Control-Allow-Origin": "*",
+        "Cache-Control": "public, max-age=86400",
+    }
+
+    if not IMAGE_PROXY_CACHE_DIR:
+        try:
+            data, content_type = await _image_proxy_fetch_bytes(url, headers)
+        except _ImageTooLarge:
+            _image_proxy_stats["tooLarge"] += 1
+            raise HTTPException(status_code=413, detail="Image too large")
+        except httpx.HTTPError:
+            raise HTTPException(status_code=502, detail="Upstream fetch failed")
+        return Response(content=data, media_type=content_type, headers=cors)
+
+    rec = await asyncio.to_thread(_image_cache_read, url)
+    # One refetch at most: the blob can be evicted between reading the record
+    # and serving it.
+    for _ in range(2):
+        if rec is not None and time.time() - float(rec.get("storedAt") or 0) <= (
+            IMAGE_PROXY_CACHE_TTL_S
+        ):
+            _image_proxy_stats["hits"] += 1
+        else:
+            rec = await _image_proxy_refresh(url, headers, rec)
+        blob = _image_blob_path(rec["sha"])
+        try:
+            os.utime(blob)  # eviction is least-recently-served first
+            break
+        except FileNotFoundError:
+            try:
+                os.remove(_image_url_record_path(url))
+            except OSError:
+                pass
+            rec = None
+    else:
+        raise HTTPException(status_code=502, detail="Upstream fetch failed")
+
+    etag = f'"{rec["sha"]}"'
+    client_tags = request.headers.get("if-none-match", "")
+    if client_tags and (
+        client_tags.strip() == "*"
+        or etag in [t.strip().removeprefix("W/") for t in client_tags.split(",")]
+    ):
+        _image_proxy_stats["notModified"] += 1
+        return Response(status_code=304, headers={**cors, "ETag": etag})
+
+    return FileResponse(
+        blob,
+        media_type=rec.get("contentType") or "image/jpeg",
+        headers={**cors, "ETag": etag},
+    )
+
+
+def _image_proxy_info() -> dict:
+    return {
+        **_image_proxy_stats,
+        "cacheDir": IMAGE_PROXY_CACHE_DIR or None,
+        "cachedBytes": _image_cache_bytes,
+    }
+
+
+class _SqliteKV:
+    """Tiny persistent key -> (stored_at, JSON value) store. Blocking; call it
+    through asyncio.to_thread."""
+
+    def __init__(self, path: str, table: str) -> None:
+        self.path = path
+        self.table = table
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute(
+                f"create table if not exists {self.table} ("
+                "key text primary key, stored_at real not null, value text not null)"
+            )
+            db.execute(
+                f"create index if not exists {self.table}_stored_at"
+                f" on {self.table}(stored_at)"
+            )
+            db.commit()
+            self._db = db
+        return self._db
+
+    def get(self, key: str) -> Optional[tuple[float, Any]]:
+        with self._lock:
+            row = (
+                self._conn()
+                .execute(
+                    f"select stored_at, value from {self.table} where key = ?", (key,)
+                )
+                .fetchone()
+            )
+        if row is None:
+            return None
+        return float(row[0]), json.loads(row[1])
+
+    def put(self, key: str, value: Any, stored_at: float) -> None:
+        with self._lock:
+            db = self._conn()
+            db.execute(
+                f"insert or replace into {self.table} (key, stored_at, value)"
+                " values (?, ?, ?)",
+                (key, stored_at, json.dumps(value)),
+            )
+            db.commit()
+
+    def items(self) -> list[tuple[str, float, Any]]:
+        with self._lock:
+            rows = (
+                self._conn()
+                .execute(f"select key, stored_at, value from {self.table}")
+                .fetchall()
+            )
+        return [(str(k), float(at), json.loads(v)) for k, at, v in rows]
+
+    def delete_where(self, sql: str, params: tuple) -> int:
+        """Run a caller-built delete against this table; returns rows deleted."""
+
+        with self._lock:
+            db = self._conn()
+            deleted = db.execute(sql, params).rowcount
+            db.commit()
+        return max(0, deleted)
+
+    def prune(self, max_rows: int, max_age_s: float, now: float) -> int:
+        """Delete rows older than `max_age_s` (if > 0), then the oldest beyond
+        `max_rows`. Returns how many rows went."""
+
+        with self._lock:
+            db = self._conn()
+            deleted = 0
+            if max_age_s > 0:
+                deleted += db.execute(
+                    f"delete from {self.table} where stored_at < ?",
+                    (now - max_age_s,),
+                ).rowcount
+            deleted += db.execute(
+                f"delete from {self.table} where key in ("
+                f"select key from {self.table} order by stored_at desc"
+                " limit -1 offset ?)",
+                (max(0, max_rows),),
+            ).rowcount
+            db.commit()
+        return max(0, deleted)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+# Geocode cache: forward lookups keyed by normalized place string, reverse lookups
+# by lat/lon grid cell. Misses are cached too (shorter TTL) so unknown places
+# don't hit Nominatim on every request; transient failures are not cached.
+GEOCODE_CACHE_TTL_S = _env_float("GEOCODE_CACHE_TTL_S", 2592000.0)
+GEOCODE_NEGATIVE_TTL_S = _env_float("GEOCODE_NEGATIVE_TTL_S", 86400.0)
+GEOCODE_CACHE_MAX_ENTRIES = int(os.getenv("GEOCODE_CACHE_MAX_ENTRIES", "5000"))
+# ~1.1 km at 0.01 degrees: far finer than the city-level names we display.
+GEOCODE_REVERSE_GRID_DEG = _env_float("GEOCODE_REVERSE_GRID_DEG", 0.01)
+GEOCODE_CACHE_PATH = os.getenv("GEOCODE_CACHE_PATH", "").strip()
+GEOCODE_CACHE_DISK_MAX_ENTRIES = int(
+    os.getenv("GEOCODE_CACHE_DISK_MAX_ENTRIES", "50000")
+)
+_GEOCODE_PRUNE_INTERVAL_S = 600.0
+_geocode_pruned_at = 0.0
+
+_geocode_cache: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+_geocode_store = (
+    _SqliteKV(GEOCODE_CACHE_PATH, "geocode_cache") if GEOCODE_CACHE_PATH else None
+)
+_geocode_stats = {
+    "hits": 0,
+    "negativeHits": 0,
+    "misses": 0,
+    "diskHits": 0,
+    "pruned": 0,
+}
+
+
+def _geocode_forward_key(place: str) -> str:
+    norm = re.sub(r"[^\w\s]", " ", (place or "").lower())
+    return "fwd:" + re.sub(r"\s+", " ", norm).strip()
+
+
+def _geocode_reverse_key(lat: float, lon: float) -> str:
+    g = GEOCODE_REVERSE_GRID_DEG if GEOCODE_REVERSE_GRID_DEG > 0 else 0.01
+    return f"rev:{round(lat / g)}:{round(lon / g)}"
+
+
+def _geocode_is_negative(value: Any) -> bool:
+    return value is None or (isinstance(value, dict) and not value.get("ok"))
+
+
+def _geocode_remember(key: str, stored_at: float, value: Any) -> None:
+    _geocode_cache.pop(key, None)
+    _geocode_cache[key] = (stored_at, value)
+    while len(_geocode_cache) > GEOCODE_CACHE_MAX_ENTRIES:
+        _geocode_cache.popitem(last=False)
+
+
+async def _geocode_cache_get(key: str) -> tuple[bool, Any]:
+    """Return (found, value); value may be a cached miss (None / ok=False)."""
+
+    hit = _geocode_cache.get(key)
+    if hit is None and _geocode_store is not None:
+        try:
+            hit = await asyncio.to_thread(_geocode_store.get, key)
+        except Exception:
+            hit = None
+        if hit is not None:
+            _geocode_stats["diskHits"] += 1
+            _geocode_remember(key, *hit)
+
+    if hit is not None:
+        stored_at, value = hit
+        negative = _geocode_is_negative(value)
+        ttl = GEOCODE_NEGATIVE_TTL_S if negative else GEOCODE_CACHE_TTL_S
+        if time.time() - stored_at <= ttl:
+            _geocode_cache.move_to_end(key)
+            _geocode_stats["negativeHits" if negative else "hits"] += 1
+            return True, value
+        _geocode_cache.pop(key, None)
+
+    _geocode_stats["misses"] += 1
+    return False, None
+
+
+async def _geocode_cache_put(key: str, value: Any) -> None:
+    stored_at = time.time()
+    _geocode_remember(key, stored_at, value)
+    if _geocode_store is not None:
+        try:
+            await asyncio.to_thread(_geocode_store.put, key, value, stored_at)
+            await _geocode_store_prune(stored_at)
+        except Exception:
+            pass
+
+
+async def _geocode_store_prune(now: float) -> None:
+    """Drop expired rows, then the oldest beyond GEOCODE_CACHE_DISK_MAX_ENTRIES
+    (at most every few minutes)."""
+
+    global _geocode_pruned_at
+    if _geocode_store is None or now - _geocode_pruned_at < _GEOCODE_PRUNE_INTERVAL_S:
+        return
+    _geocode_pruned_at = now
+    _geocode_stats["pruned"] += await asyncio.to_thread(
+        _geocode_store.prune,
+        GEOCODE_CACHE_DISK_MAX_ENTRIES,
+        max(GEOCODE_CACHE_TTL_S, GEOCODE_NEGATIVE_TTL_S),
+        now,
+    )
+
+
+def _geocode_cache_info() -> dict:
+    return {
+        **_geocode_stats,
+        "entries": len(_geocode_cache),
+        "persistent": _geocode_store is not None,
+    }
+
+
+class _GeocodeUnavailable(RuntimeError):
+    """Nominatim couldn't answer (HTTP error, timeout); not a real miss."""
+
+
+# Nominatim's public usage policy allows about one request per second. Lookups go
+# through a token bucket; user-facing lookups (the user's own location) jump the
+# queue ahead of candidate distance checks. NOMINATIM_RPS=0 disables the limit
+# (default for self-hosted instances).
+_NOMINATIM_PUBLIC = "nominatim.openstreetmap.org" in NOMINATIM_URL
+NOMINATIM_RPS = _env_float("NOMINATIM_RPS", 1.0 if _NOMINATIM_PUBLIC else 0.0)
+NOMINATIM_BURST = int(os.getenv("NOMINATIM_BURST", "1"))
+NOMINATIM_MAX_WAIT_S = _env_float("NOMINATIM_MAX_WAIT_S", 10.0)
+
+_GEO_PRIORITY_USER = 0
+_GEO_PRIORITY_CANDIDATE = 1
+# Speculative candidate-pool lookups: only use capacity nothing else is waiting for.
+_GEO_PRIORITY_PREFETCH = 2
+
+
+class _NominatimClient:
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._seq = 0
+        self._waiting: list[tuple[int, int, asyncio.Future]] = []
+        self._pump_task: Optional[asyncio.Task] = None
+        self.waits: deque[float] = deque(maxlen=200)
+        self.stats = {"requests": 0, "queued": 0, "timeouts": 0, "throttled": 0}
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def _acquire(self, priority: int) -> None:
+        if self.rate <= 0:
+            return
+        self._refill()
+        if (
+            not self._waiting
+            and self.tokens >= 1
+            and time.monotonic() >= self.paused_until
+        ):
+            self.tokens -= 1
+            self.waits.append(0.0)
+            return
+
+        fut: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._seq += 1
+        heapq.heappush(self._waiting, (priority, self._seq, fut))
+        self.stats["queued"] += 1
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = asyncio.create_task(self._pump())
+
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(fut, NOMINATIM_MAX_WAIT_S)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise _GeocodeUnavailable("nominatim queue wait exceeded")
+        self.waits.append(time.monotonic() - started)
+
+    async def _pump(self) -> None:
+        while self._waiting:
+            self._refill()
+            delay = max(0.0, self.paused_until - time.monotonic())
+            if not delay and self.tokens < 1:
+                delay = (1 - self.tokens) / self.rate
+            if delay:
+                await asyncio.sleep(delay)
+                continue
+            _, _, fut = heapq.heappop(self._waiting)
+            if fut.done():
+                # Caller gave up (timeout or disconnect); don't spend a token.
+                continue
+            self.tokens -= 1
+            fut.set_result(None)
+
+    async def get(
+        self, path: str, params: dict, *, priority: int, timeout: float
+    ) -> httpx.Response:
+        await self._acquire(priority)
+        self.stats["requests"] += 1
+        resp = await _http_client("nominatim").get(
+            f"{NOMINATIM_URL}{path}",
+            params=params,
+            headers={
+                "Accept": "application/json",
+                # Nominatim policy prefers identifiable UA; keep it generic and non-personal.
+                "User-Agent": "fud-buddy-dev/1.0",
+                "Accept-Language": "en",
+            },
+            timeout=timeout,
+        )
+        if resp.status_code in (429, 503):
+            # Being throttled anyway: stop sending for a while.
+            self.stats["throttled"] += 1
+            try:
+                pause = float(resp.headers.get("retry-after") or 5)
+            except ValueError:
+                pause = 5.0
+            self.paused_until = time.monotonic() + min(60.0, max(1.0, pause))
+        return resp
+
+    def info(self) -> dict:
+        waits = sorted(self.waits)
+        return {
+            **self.stats,
+            "rps": self.rate,
+            "waiting": sum(1 for *_, f in self._waiting if not f.done()),
+            "p50WaitSeconds": round(waits[len(waits) // 2], 3) if waits else None,
+            "maxWaitSeconds": round(waits[-1], 3) if waits else None,
+        }
+
+
+_nominatim = _NominatimClient(NOMINATIM_RPS, NOMINATIM_BURST)
+
+
+@app.get("/api/geocode/reverse")
+async def reverse_geocode(lat: float, lon: float):
+    """Reverse geocode lat/lon into a human-friendly place.
+
+    This is intentionally best-effort (no keys required) and returns a short display string.
+    Answers are cached per grid cell (see GEOCODE_REVERSE_GRID_DEG).
+    """
+
+    key = _geocode_reverse_key(lat, lon)
+    found, cached = await _geocode_cache_get(key)
+    if found:
+        return cached
+
+    result = await _reverse_geocode_upstream(lat, lon)
+    # HTTP errors and exceptions are transient; don't pin them in the cache.
+    if "status" not in result and "error" not in result:
+        await _geocode_cache_put(key, result)
+    return result
+
+
+async def _reverse_geocode_upstream(lat: float, lon: float) -> dict:
+    params = {
+        "format": "jsonv2",
+        "lat": str(lat),
+        "lon": str(lon),
+    }
+
+    try:
+        # The user is waiting on this one (location permission just granted).
+        resp = await _nominatim.get(
+            "/reverse", params, priority=_GEO_PRIORITY_USER, timeout=8.0
+        )
+        if resp.status_code != 200:
+            return {"ok": False, "display": "", "status": resp.status_code}
+
+        data = resp.json()
+        addr = data.get("address") or {}
+        if not isinstance(addr, dict):
+            addr = {}
+
+        city = (
+            addr.get("city")
+            or addr.get("town")
+            or addr.get("village")
+            or addr.get("hamlet")
+            or addr.get("county")
+            or ""
+        )
+        state = (
+            addr.get("state") or addr.get("region") or addr.get("state_district") or ""
+        )
+
+        if isinstance(city, str) and isinstance(state, str) and city and state:
+            return {"ok": True, "display": f"{city}, {state}"}
+        if isinstance(city, str) and city:
+            return {"ok": True, "display": city}
+
+        display_name = data.get("display_name")
+        if isinstance(display_name, str) and display_name:
+            short = ", ".join(
+                [p.strip() for p in display_name.split(",")[:3] if p.strip()]
+            )
+            return {"ok": True, "display": short}
+
+        return {"ok": False, "display": ""}
+    except Exception as e:
+        return {"ok": False, "display": "", "error": str(e)}
+
+
+@app.get("/api/loader/images")
+async def loader_images(location: str = "", vibe: str = ""):
+    """Return a few food photo URLs for the loading screen.
+
+    This is best-effort and intentionally lightweight.
+    """
+
+    loc = (location or "").strip()
+    vb = (vibe or "").strip().replace("-", " ")
+    if _looks_like_coords(loc):
+        loc = "nearby"
+
+    parts = ["food", "dish", "photo"]
+    if vb:
+        parts.insert(1, vb)
+    if loc and loc.lower() not in ("near me", "near you"):
+        parts.insert(1, loc)
+    q = " ".join([p for p in parts if p])
+
+    try:
+        items = await search_images(q)
+    except Exception:
+        items = []
 
     urls: list[str] = []
     for it in items[:18]:
@@ -669,6 +2099,21 @@ async def loader_images(location: str = "", vibe: str = ""):
 async def _startup() -> None:
     global db_pool
 
+    for name in _HTTP_UPSTREAMS:
+        _http_client(name)
+
+    try:
+        await asyncio.to_thread(_place_index.load)
+    except Exception as e:
+        print(f"Place index load failed: {e}")
+
+    # Ollama is only used when no server-side OpenRouter key is configured.
+    if not OPENROUTER_API_KEY:
+        if OLLAMA_WARMUP:
+            _background_tasks.add(asyncio.create_task(_ollama_warmup()))
+        if OLLAMA_KEEPWARM_INTERVAL_S > 0:
+            _background_tasks.add(asyncio.create_task(_ollama_keepwarm_loop()))
+
     if not DATABASE_URL:
         return
 
@@ -701,6 +2146,12 @@ async def _startup() -> None:
                   consent_contact boolean not null default false,
                   consent_public boolean not null default false
                 );
+
+                create table if not exists fud_places_cache (
+                  key text primary key,
+                  stored_at double precision not null,
+                  value jsonb not null
+                );
                 """
             )
         await conn.commit()
@@ -708,7 +2159,21 @@ async def _startup() -> None:
 
 @app.on_event("shutdown")
 async def _shutdown() -> None:
-    global db_pool
+    global db_pool, _corpus_db
+    for t in _background_tasks:
+        t.cancel()
+    _background_tasks.clear()
+    await _close_http_clients()
+    if _corpus_db is not None:
+        with _corpus_lock:
+            _corpus_db.close()
+        _corpus_db = None
+    if _geocode_store is not None:
+        _geocode_store.close()
+    if _place_index.store is not None:
+        _place_index.store.close()
+    if _places_store is not None:
+        _places_store.close()
     if db_pool is not None:
         await db_pool.close()
         db_pool = None
@@ -782,50 +2247,132 @@ async def _persist_feedback(feedback_id: uuid.UUID, payload: FeedbackRequest) ->
         await conn.commit()
 
 
+# Singleflight: concurrent identical upstream calls share one in-flight task.
+_inflight: dict[tuple[str, str], asyncio.Task] = {}
+# (kind, key) -> [callers awaiting, any caller wants it to outlive them]
+_inflight_waiters: dict[tuple[str, str], list] = {}
+_singleflight_stats: dict[str, dict[str, int]] = {}
+
+
+async def _singleflight(
+    kind: str, key: str, factory: Any, *, detach: bool = True
+) -> Any:
+    """Await `factory()`, or the already-running call for the same (kind, key).
+
+    The shared task is shielded so one caller going away (client disconnect)
+    doesn't cancel it for everyone else. With `detach=False` (speculative work)
+    it is cancelled once every caller has gone, unless a detached caller joined.
+    """
+
+    stats = _singleflight_stats.setdefault(kind, {"calls": 0, "deduplicated": 0})
+    stats["calls"] += 1
+    task = _inflight.get((kind, key))
+    if task is None:
+        task = asyncio.create_task(factory())
+        _inflight[(kind, key)] = task
+
+        def _forget(t: asyncio.Task) -> None:
+            if _inflight.get((kind, key)) is t:
+                del _inflight[(kind, key)]
+                _inflight_waiters.pop((kind, key), None)
+
+        task.add_done_callback(_forget)
+    else:
+        stats["deduplicated"] += 1
+
+    waiters = _inflight_waiters.setdefault((kind, key), [0, False])
+    waiters[0] += 1
+    waiters[1] = waiters[1] or detach
+    try:
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        if waiters[0] == 1 and not waiters[1] and not task.done():
+            task.cancel()
+        raise
+    finally:
+        waiters[0] -= 1
+
+
+def _singleflight_info() -> dict:
+    return {**_singleflight_stats, "inFlight": len(_inflight)}
+
+
 async def search_web(
-    query: str, client: Optional[httpx.AsyncClient] = None
+    query: str, client: Optional[httpx.AsyncClient] = None, location: str = ""
 ) -> list[dict]:
     """Return a small list of search results.
 
-    Prefers SearxNG (self-hosted) when SEARXNG_URL is set.
-    Falls back to DuckDuckGo HTML only as a last resort.
+    Prefers SearxNG (self-hosted) when SEARXNG_URL is set; results are served
+    from the local corpus or the search cache when possible. `location` scopes
+    corpus lookups and tags harvested results; restaurant-specific lookups (menu,
+    photos) pass no location and bypass the corpus.
     """
 
-    if SEARXNG_URL:
-        try:
-            if client is None:
-                async with httpx.AsyncClient(timeout=12.0, follow_redirects=True) as c:
-                    return await search_web(query, client=c)
-
-            resp = await client.get(
-                f"{SEARXNG_URL.rstrip('/')}/search",
-                params={
-                    "q": query,
-                    "format": "json",
-                    "language": "en",
-                    "safesearch": "1",
-                },
-            )
-            if resp.status_code == 200:
-                payload = resp.json()
-                results = payload.get("results", [])
-                out: list[dict] = []
-                for r in results[:6]:
-                    out.append(
-                        {
-                            "title": r.get("title") or "",
-                            "url": r.get("url") or "",
-                            "content": r.get("content") or "",
-                            "engine": r.get("engine") or "",
-                        }
-                    )
-                return out
-        except Exception:
-            # If SearxNG is down, fall back.
-            pass
+    if not SEARXNG_URL:
+        # No brittle scraping fallback in production.
+        return []
+    if not SEARCH_CORPUS_PATH or not _corpus_norm_location(location):
+        return await _cached_search("general", query, _fetch_web_results, client)
+
+    loc = _corpus_norm_location(location)
+    local = await _corpus_search(query, loc, 6)
+    if len(local) >= min(6, SEARCH_CORPUS_MIN_HITS):
+        _corpus_stats["answered"] += 1
+        return local
+
+    async def _fetch_and_harvest(
+        q: str, c: Optional[httpx.AsyncClient] = None
+    ) -> Optional[list[dict]]:
+        results = await _fetch_web_results(q, c)
+        if results:
+            await _corpus_add(results, loc, q)
+        return results
+
+    live = await _cached_search("general", query, _fetch_and_harvest, client)
+    urls = {r.get("url") for r in live}
+    extra = [r for r in local if r.get("url") not in urls]
+    if live and extra:
+        _corpus_stats["toppedUp"] += 1
+    else:
+        _corpus_stats["live"] += 1
+    return (live + extra)[:6] if live else local
+
+
+async def _fetch_web_results(
+    query: str, client: Optional[httpx.AsyncClient] = None
+) -> Optional[list[dict]]:
+    """One SearxNG web query; None when SearxNG is down or errors."""
+
+    try:
+        if client is None:
+            client = _http_client("searxng")
 
-    # Fallback: return an empty list (we don't want brittle scraping in production).
-    return []
+        resp = await client.get(
+            f"{SEARXNG_URL.rstrip('/')}/search",
+            params={
+                "q": query,
+                "format": "json",
+                "language": "en",
+                "safesearch": "1",
+            },
+        )
+        if resp.status_code != 200:
+            return None
+        payload = resp.json()
+        results = payload.get("results", [])
+        out: list[dict] = []
+        for r in results[:6]:
+            out.append(
+                {
+                    "title": r.get("title") or "",
+                    "url": r.get("url") or "",
+                    "content": r.get("content") or "",
+                    "engine": r.get("engine") or "",
+                }
+            )
+        return out
+    except Exception:
+        return None
 
 
 async def search_images(
@@ -838,11 +2385,15 @@ async def search_images(
 
     if not SEARXNG_URL:
         return []
+    return await _cached_search("images", query, _fetch_image_results, client)
+
 
+async def _fetch_image_results(
+    query: str, client: Optional[httpx.AsyncClient] = None
+) -> Optional[list[dict]]:
     try:
         if client is None:
-            async with httpx.AsyncClient(timeout=12.0, follow_redirects=True) as c:
-                return await search_images(query, client=c)
+            client = _http_client("searxng")
 
         resp = await client.get(
             f"{SEARXNG_URL.rstrip('/')}/search",
@@ -855,7 +2406,7 @@ async def search_images(
             },
         )
         if resp.status_code != 200:
-            return []
+            return None
 
         payload = resp.json()
         results = payload.get("results", [])
@@ -875,9 +2426,465 @@ async def search_images(
                 )
         return out
     except Exception:
+        return None
+
+
+# SearxNG result cache: fresh for SEARCH_CACHE_TTL_S, then served stale (while a
+# background refresh runs) for another SEARCH_CACHE_STALE_S. With
+# SEARCH_CACHE_DIR set, entries are also written to disk and survive restarts.
+SEARCH_CACHE_TTL_S = _env_float("SEARCH_CACHE_TTL_S", 21600.0)
+SEARCH_CACHE_STALE_S = _env_float("SEARCH_CACHE_STALE_S", 172800.0)
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "1000"))
+SEARCH_CACHE_DIR = os.getenv("SEARCH_CACHE_DIR", "").strip()
+SEARCH_CACHE_DISK_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_DISK_MAX_ENTRIES", "20000"))
+_SEARCH_DISK_PRUNE_INTERVAL_S = 600.0
+_search_disk_pruned_at = 0.0
+_search_disk_prune_lock = threading.Lock()
+
+_search_cache: "OrderedDict[str, tuple[float, list[dict]]]" = OrderedDict()
+_search_refreshing: set[str] = set()
+_search_cache_stats: dict[str, Any] = {
+    "hits": 0,
+    "staleHits": 0,
+    "misses": 0,
+    "diskHits": 0,
+    "refreshes": 0,
+    "refreshErrors": 0,
+    "servedAfterError": 0,
+    "evictions": 0,
+    "diskEvictions": 0,
+    "maxStaleAgeSeconds": 0.0,
+}
+
+
+def _search_cache_key(category: str, query: str) -> str:
+    norm = re.sub(r"\s+", " ", query or "").strip().lower()
+    return hashlib.sha256(f"{category}\n{norm}".encode("utf-8")).hexdigest()
+
+
+def _search_cache_path(key: str) -> str:
+    return os.path.join(SEARCH_CACHE_DIR, f"{key}.json")
+
+
+def _search_disk_read(key: str) -> Optional[tuple[float, list[dict]]]:
+    try:
+        with open(_search_cache_path(key), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        stored_at = float(data.get("storedAt") or 0)
+        results = data.get("results")
+        if not isinstance(results, list):
+            return None
+        return stored_at, results
+    except Exception:
+        return None
+
+
+def _search_disk_write(key: str, stored_at: float, query: str, results: list) -> None:
+    try:
+        os.makedirs(SEARCH_CACHE_DIR, exist_ok=True)
+        path = _search_cache_path(key)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"storedAt": stored_at, "query": query, "results": results}, f)
+        os.replace(tmp, path)
+        _search_disk_prune(stored_at)
+    except Exception:
+        pass
+
+
+def _search_disk_prune(now: float) -> None:
+    """Drop files past the stale window, then the oldest beyond
+    SEARCH_CACHE_DISK_MAX_ENTRIES. Other workers share the directory, so this
+    re-scans it rather than trusting a local count."""
+
+    global _search_disk_pruned_at
+    if now - _search_disk_pruned_at < _SEARCH_DISK_PRUNE_INTERVAL_S:
+        return
+    if not _search_disk_prune_lock.acquire(blocking=False):
+        return
+    try:
+        _search_disk_pruned_at = now
+        entries = []
+        for e in os.scandir(SEARCH_CACHE_DIR):
+            if not (e.is_file() and e.name.endswith(".json")):
+                continue  # skip in-progress writes
+            try:
+                entries.append((e.stat().st_mtime, e.path))
+            except OSError:
+                continue
+        entries.sort(reverse=True)
+        cutoff = now - (SEARCH_CACHE_TTL_S + SEARCH_CACHE_STALE_S)
+        keep = max(0, SEARCH_CACHE_DISK_MAX_ENTRIES)
+        for i, (mtime, path) in enumerate(entries):
+            if i < keep and mtime >= cutoff:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            _search_cache_stats["diskEvictions"] += 1
+    finally:
+        _search_disk_prune_lock.release()
+
+
+def _search_cache_store(key: str, stored_at: float, results: list[dict]) -> None:
+    _search_cache.pop(key, None)
+    _search_cache[key] = (stored_at, results)
+    while len(_search_cache) > SEARCH_CACHE_MAX_ENTRIES:
+        _search_cache.popitem(last=False)
+        _search_cache_stats["evictions"] += 1
+
+
+async def _search_cache_put(key: str, query: str, results: list[dict]) -> None:
+    stored_at = time.time()
+    _search_cache_store(key, stored_at, results)
+    if SEARCH_CACHE_DIR:
+        await asyncio.to_thread(_search_disk_write, key, stored_at, query, results)
+
+
+async def _search_refresh(key: str, category: str, query: str, fetch: Any) -> None:
+    try:
+        results = await _singleflight(category, key, lambda: fetch(query, None))
+        if results:
+            await _search_cache_put(key, query, results)
+        else:
+            _search_cache_stats["refreshErrors"] += 1
+    finally:
+        _search_refreshing.discard(key)
+
+
+async def _cached_search(
+    category: str,
+    query: str,
+    fetch: Any,
+    client: Optional[httpx.AsyncClient] = None,
+) -> list[dict]:
+    """Serve `fetch(query, client)` results through the search cache.
+
+    Empty or failed fetches are never cached. If a fetch fails, an expired entry
+    is still better than nothing and is returned instead.
+    """
+
+    key = _search_cache_key(category, query)
+
+    def _fetch() -> Any:
+        return _singleflight(category, key, lambda: fetch(query, client))
+
+    if SEARCH_CACHE_TTL_S <= 0:
+        return [dict(r) for r in await _fetch() or []]
+
+    hit = _search_cache.get(key)
+    if hit is None and SEARCH_CACHE_DIR:
+        hit = await asyncio.to_thread(_search_disk_read, key)
+        if hit is not None:
+            _search_cache_stats["diskHits"] += 1
+            _search_cache_store(key, *hit)
+
+    if hit is not None:
+        stored_at, results = hit
+        age = time.time() - stored_at
+        if age <= SEARCH_CACHE_TTL_S:
+            _search_cache.move_to_end(key)
+            _search_cache_stats["hits"] += 1
+            return [dict(r) for r in results]
+        if age <= SEARCH_CACHE_TTL_S + SEARCH_CACHE_STALE_S:
+            _search_cache.move_to_end(key)
+            _search_cache_stats["staleHits"] += 1
+            _search_cache_stats["maxStaleAgeSeconds"] = round(
+                max(_search_cache_stats["maxStaleAgeSeconds"], age), 1
+            )
+            if key not in _search_refreshing:
+                _search_refreshing.add(key)
+                _search_cache_stats["refreshes"] += 1
+                task = asyncio.create_task(_search_refresh(key, category, query, fetch))
+                _background_tasks.add(task)
+                task.add_done_callback(_background_tasks.discard)
+            return [dict(r) for r in results]
+
+    _search_cache_stats["misses"] += 1
+    fresh = await _fetch()
+    if fresh:
+        await _search_cache_put(key, query, fresh)
+        return [dict(r) for r in fresh]
+    if hit is not None:
+        _search_cache_stats["servedAfterError"] += 1
+        return [dict(r) for r in hit[1]]
+    return fresh or []
+
+
+def _search_cache_info() -> dict:
+    return {
+        **_search_cache_stats,
+        "entries": len(_search_cache),
+        "refreshing": len(_search_refreshing),
+        "ttlSeconds": SEARCH_CACHE_TTL_S,
+        "staleSeconds": SEARCH_CACHE_STALE_S,
+        "disk": bool(SEARCH_CACHE_DIR),
+    }
+
+
+# Local full-text corpus of harvested SearxNG web results (SQLite FTS5). With
+# SEARCH_CORPUS_PATH set, search_web answers from it when enough fresh documents
+# match and only goes live to top up.
+SEARCH_CORPUS_PATH = os.getenv("SEARCH_CORPUS_PATH", "").strip()
+SEARCH_CORPUS_MAX_AGE_S = _env_float("SEARCH_CORPUS_MAX_AGE_S", 604800.0)
+SEARCH_CORPUS_MIN_HITS = int(os.getenv("SEARCH_CORPUS_MIN_HITS", "6"))
+SEARCH_CORPUS_MAX_DOCS = int(os.getenv("SEARCH_CORPUS_MAX_DOCS", "50000"))
+# Expired/over-cap documents are deleted at most this often (on harvest).
+_CORPUS_PRUNE_INTERVAL_S = 600.0
+
+_corpus_db: Optional[sqlite3.Connection] = None
+_corpus_lock = threading.Lock()
+_corpus_pruned_at = 0.0
+_corpus_stats = {
+    "answered": 0,
+    "toppedUp": 0,
+    "live": 0,
+    "harvested": 0,
+    "pruned": 0,
+    "errors": 0,
+}
+
+# Words that say nothing about which documents match.
+_CORPUS_STOPWORDS = {
+    "a",
+    "and",
+    "best",
+    "food",
+    "for",
+    "good",
+    "in",
+    "near",
+    "of",
+    "rated",
+    "restaurant",
+    "restaurants",
+    "the",
+    "top",
+}
+
+
+def _corpus_norm_location(location: str) -> str:
+    return re.sub(r"\s+", " ", location or "").strip().lower()
+
+
+def _corpus_conn() -> sqlite3.Connection:
+    global _corpus_db
+    if _corpus_db is None:
+        os.makedirs(os.path.dirname(SEARCH_CORPUS_PATH) or ".", exist_ok=True)
+        db = sqlite3.connect(SEARCH_CORPUS_PATH, check_same_thread=False)
+        db.executescript("""
+            create table if not exists search_docs (
+              id integer primary key,
+              url text not null unique,
+              title text not null,
+              content text not null,
+              engine text not null,
+              location text not null,
+              query text not null,
+              fetched_at real not null
+            );
+            create index if not exists search_docs_location
+              on search_docs(location, fetched_at);
+            create index if not exists search_docs_fetched
+              on search_docs(fetched_at);
+            create virtual table if not exists search_fts using fts5(
+              title, content, content='search_docs', content_rowid='id',
+              tokenize='porter unicode61'
+            );
+            create trigger if not exists search_docs_ai after insert on search_docs
+            begin
+              insert into search_fts(rowid, title, content)
+                values (new.id, new.title, new.content);
+            end;
+            create trigger if not exists search_docs_ad after delete on search_docs
+            begin
+              insert into search_fts(search_fts, rowid, title, content)
+                values ('delete', old.id, old.title, old.content);
+            end;
+            create trigger if not exists search_docs_au after update on search_docs
+            begin
+              insert into search_fts(search_fts, rowid, title, content)
+                values ('delete', old.id, old.title, old.content);
+              insert into search_fts(rowid, title, content)
+                values (new.id, new.title, new.content);
+            end;
+            """)
+        _corpus_db = db
+    return _corpus_db
+
+
+def _corpus_add_sync(results: list[dict], location: str, query: str) -> None:
+    now = time.time()
+    rows = [
+        (
+            str(r.get("url") or ""),
+            str(r.get("title") or ""),
+            str(r.get("content") or ""),
+            str(r.get("engine") or ""),
+            location,
+            query,
+            now,
+        )
+        for r in results
+        if r.get("url")
+    ]
+    with _corpus_lock:
+        db = _corpus_conn()
+        db.executemany(
+            """
+            insert into search_docs
+              (url, title, content, engine, location, query, fetched_at)
+            values (?, ?, ?, ?, ?, ?, ?)
+            on conflict(url) do update set
+              title = excluded.title,
+              content = excluded.content,
+              engine = excluded.engine,
+              location = case when excluded.location != ''
+                then excluded.location else search_docs.location end,
+              query = excluded.query,
+              fetched_at = excluded.fetched_at
+            """,
+            rows,
+        )
+        db.commit()
+        _corpus_prune(db, now)
+
+
+def _corpus_prune(db: sqlite3.Connection, now: float) -> None:
+    """Drop documents past SEARCH_CORPUS_MAX_AGE_S, then the oldest beyond
+    SEARCH_CORPUS_MAX_DOCS. Caller holds _corpus_lock; the delete trigger keeps
+    search_fts in step."""
+
+    global _corpus_pruned_at
+    if now - _corpus_pruned_at < _CORPUS_PRUNE_INTERVAL_S:
+        return
+    _corpus_pruned_at = now
+    cur = db.execute(
+        "delete from search_docs where fetched_at < ?",
+        (now - SEARCH_CORPUS_MAX_AGE_S,),
+    )
+    deleted = cur.rowcount
+    cur = db.execute(
+        """
+        delete from search_docs where id in (
+          select id from search_docs order by fetched_at desc limit -1 offset ?
+        )
+        """,
+        (max(0, SEARCH_CORPUS_MAX_DOCS),),
+    )
+    deleted += cur.rowcount
+    db.commit()
+    _corpus_stats["pruned"] += max(0, deleted)
+
+
+def _corpus_search_sync(query: str, location: str, limit: int) -> list[dict]:
+    loc_terms = set(re.findall(r"[a-z0-9]+", location))
+    terms = [
+        t
+        for t in re.findall(r"[a-z0-9]+", (query or "").lower())
+        if t not in _CORPUS_STOPWORDS and not (location and t in loc_terms)
+    ]
+    if not terms:
+        # Nothing left to match on (e.g. "top rated restaurants in <city>"): the
+        # most recent documents for the location would be unrelated, so go live.
+        return []
+
+    where = ["d.fetched_at >= ?"]
+    params: list[Any] = [time.time() - SEARCH_CORPUS_MAX_AGE_S]
+    if location:
+        where.append("d.location = ?")
+        params.append(location)
+    # Every remaining term must match; quoting keeps FTS syntax out of it.
+    sql = f"""
+        select d.title, d.url, d.content, d.engine
+        from search_fts join search_docs d on d.id = search_fts.rowid
+        where search_fts match ? and {" and ".join(where)}
+        order by bm25(search_fts) limit ?
+    """
+    params = [" ".join(f'"{t}"' for t in terms)] + params + [limit]
+
+    with _corpus_lock:
+        rows = _corpus_conn().execute(sql, params).fetchall()
+    return [
+        {"title": title, "url": url, "content": content, "engine": engine}
+        for title, url, content, engine in rows
+    ]
+
+
+async def _corpus_search(query: str, location: str, limit: int) -> list[dict]:
+    try:
+        return await asyncio.to_thread(_corpus_search_sync, query, location, limit)
+    except Exception:
+        _corpus_stats["errors"] += 1
         return []
 
 
+async def _corpus_add(results: list[dict], location: str, query: str) -> None:
+    try:
+        await asyncio.to_thread(_corpus_add_sync, results, location, query)
+        _corpus_stats["harvested"] += len(results)
+    except Exception:
+        _corpus_stats["errors"] += 1
+
+
+def _corpus_info() -> dict:
+    info: dict[str, Any] = {**_corpus_stats, "enabled": bool(SEARCH_CORPUS_PATH)}
+    if SEARCH_CORPUS_PATH and _corpus_db is not None:
+        try:
+            with _corpus_lock:
+                info["documents"] = _corpus_db.execute(
+                    "select count(*) from search_docs"
+                ).fetchone()[0]
+        except Exception:
+            pass
+    return info
+
+
+# Search planner: "|"-separated query templates. Placeholders: {vibe}, {cuisine}
+# ("" when any), {location} and {base_query} ("<cuisine> restaurants in <location>").
+# Supplementary queries top up Option B's sources; with SEARCH_SPECULATIVE=1 they
+# run in the same wave as the primary ones instead of after them.
+SEARCH_QUERIES = os.getenv(
+    "SEARCH_QUERIES", "best {vibe} {base_query}|top rated {base_query}"
+)
+SEARCH_SUPPLEMENTARY_QUERIES = os.getenv(
+    "SEARCH_SUPPLEMENTARY_QUERIES", "best {vibe} restaurants {location} hidden gem"
+)
+SEARCH_SPECULATIVE = os.getenv("SEARCH_SPECULATIVE", "1") == "1"
+
+
+def _plan_searches(
+    vibe: str, cuisine: str, location: str
+) -> tuple[list[str], list[str]]:
+    """Return (primary, supplementary) search queries for one request."""
+
+    cuisine = "" if cuisine == "any" else cuisine
+    fields = {
+        "vibe": vibe.replace("-", " "),
+        "cuisine": cuisine,
+        "location": location,
+        "base_query": f"{cuisine} restaurants in {location}".strip(),
+    }
+
+    seen: set[str] = set()
+
+    def _render(templates: str) -> list[str]:
+        out: list[str] = []
+        for t in templates.split("|"):
+            try:
+                q = t.format_map(fields)
+            except (KeyError, ValueError, IndexError):
+                continue
+            q = re.sub(r"\s+", " ", q).strip()
+            if q and q.lower() not in seen:
+                seen.add(q.lower())
+                out.append(q)
+        return out
+
+    return _render(SEARCH_QUERIES), _render(SEARCH_SUPPLEMENTARY_QUERIES)
+
+
 def _sse(data: Any) -> dict:
     # EventSourceResponse will serialize dict -> SSE lines. We always send JSON in `data`.
     return {"data": json.dumps(data)}
@@ -917,51 +2924,575 @@ def _haversine_km(a: tuple[float, float], b: tuple[float, float]) -> float:
     return 2 * r * math.asin(min(1.0, math.sqrt(x)))
 
 
-async def _forward_geocode(place: str) -> Optional[tuple[float, float]]:
+# Offline gazetteer (gazetteer.tsv): resolves common locations to coordinates and
+# an urban/suburban/rural class without a Nominatim round trip.
+GAZETTEER_PATH = os.getenv(
+    "GAZETTEER_PATH", os.path.join(os.path.dirname(__file__), "gazetteer.tsv")
+)
+
+# Canadian FSA: letter, digit, letter. A "0" digit marks a rural FSA.
+_FSA_RE = re.compile(r"\b([a-z]\d[a-z])(?:\s?\d[a-z]\d)?\b")
+
+
+def _gazetteer_norm(text: str) -> str:
+    return re.sub(r"[^\w]+", " ", (text or "").lower()).strip()
+
+
+class _Gazetteer:
+    def __init__(self) -> None:
+        self.places: dict[str, list[dict]] = {}
+        self.keywords: set[str] = set()
+        self.fsa: dict[str, dict] = {}
+        # Province code/name tokens -> province code.
+        self.provinces: dict[str, str] = {}
+        self.province_tokens: dict[str, set[str]] = {}
+        self.max_words = 1
+        self.stats = {"lookups": 0, "resolved": 0}
+
+    def load(self, path: str) -> None:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return
+
+        for line in lines:
+            if not line.strip() or line.startswith("#") or line.startswith("kind\t"):
+                continue
+            cols = (line.split("\t") + [""] * 9)[:9]
+            kind, name, aliases, prov, lat, lon, density, parent, flags = cols
+            names = [name] + [a for a in aliases.split("|") if a]
+            keys = [k for k in (_gazetteer_norm(n) for n in names) if k]
+            if kind == "province":
+                toks = {prov.lower()}
+                for k in keys:
+                    toks.update(k.split())
+                    self.provinces[k] = prov
+                self.provinces[prov.lower()] = prov
+                self.province_tokens[prov] = toks
+                continue
+            if kind == "keyword":
+                self.keywords.update(keys)
+                continue
+
+            coords: Optional[tuple[float, float]] = None
+            try:
+                coords = (float(lat), float(lon))
+            except ValueError:
+                coords = None
+            entry = {
+                "kind": kind,
+                "name": name,
+                "province": prov,
+                "coords": coords,
+                "density": density or "urban",
+                "parent": _gazetteer_norm(parent),
+                "ambiguous": "ambiguous" in flags,
+            }
+            if kind == "postal":
+                self.fsa[name.lower()] = entry
+                continue
+            for k in keys:
+                self.places.setdefault(k, []).append(entry)
+                self.max_words = max(self.max_words, len(k.split()))
+
+    def lookup(self, text: str) -> Optional[dict]:
+        """Resolve free text to {name, kind, province, coords, density}.
+
+        `coords` is None when the match is only good enough for the density class
+        (an ambiguous bare name, or leftover words we can't account for).
+        """
+
+        self.stats["lookups"] += 1
+        found = self._lookup(text)
+        if found is not None:
+            self.stats["resolved"] += 1
+        return found
+
+    def _lookup(self, text: str) -> Optional[dict]:
+        raw = (text or "").lower()
+        m = _FSA_RE.search(raw)
+        if m:
+            fsa = m.group(1)
+            if fsa[1] == "0":
+                return {
+                    "name": fsa.upper(),
+                    "kind": "postal",
+                    "province": "",
+                    "coords": None,
+                    "density": "rural",
+                }
+            e = self.fsa.get(fsa)
+            if e is not None:
+                return self._result(e, e["coords"])
+            return {
+                "name": fsa.upper(),
+                "kind": "postal",
+                "province": "",
+                "coords": None,
+                "density": "urban",
+            }
+
+        tokens = _gazetteer_norm(text).split()
+        for n in range(min(self.max_words, len(tokens)), 0, -1):
+            for i in range(len(tokens) - n + 1):
+                entries = self.places.get(" ".join(tokens[i : i + n]))
+                if entries:
+                    return self._resolve(entries, tokens[:i] + tokens[i + n :])
+
+        if any(t in self.keywords for t in tokens):
+            return {
+                "name": "",
+                "kind": "keyword",
+                "province": "",
+                "coords": None,
+                "density": "urban",
+            }
+        return None
+
+    def _resolve(self, entries: list[dict], leftover: list[str]) -> Optional[dict]:
+        mentioned = {self.provinces[t] for t in leftover if t in self.provinces}
+        left = " ".join(leftover)
+        for prov_name, code in self.provinces.items():
+            if " " in prov_name and prov_name in left:
+                mentioned.add(code)
+        if mentioned:
+            entries = [e for e in entries if e["province"] in mentioned]
+            if not entries:
+                # e.g. "Windsor, NS" or "Vancouver WA": not the place we know.
+                return None
+
+        def _qualified(e: dict) -> bool:
+            return bool(mentioned) or (bool(e["parent"]) and e["parent"] in left)
+
+        entry = next((e for e in entries if _qualified(e)), entries[0])
+        allowed = set(self.keywords) | {"canada", "ca"}
+        allowed |= self.province_tokens.get(entry["province"], set())
+        allowed |= set(entry["parent"].split())
+        clean = all(t in allowed for t in leftover)
+        usable = clean and (not entry["ambiguous"] or _qualified(entry))
+        return self._result(entry, entry["coords"] if usable else None)
+
+    @staticmethod
+    def _result(e: dict, coords: Optional[tuple[float, float]]) -> dict:
+        return {
+            "name": e["name"],
+            "kind": e["kind"],
+            "province": e["province"],
+            "coords": coords,
+            "density": e["density"],
+        }
+
+    def info(self) -> dict:
+        return {
+            **self.stats,
+            "places": sum(len(v) for v in self.places.values()),
+            "postalCodes": len(self.fsa),
+        }
+
+
+_gazetteer = _Gazetteer()
+_gazetteer.load(GAZETTEER_PATH)
+
+
+async def _forward_geocode(
+    place: str, priority: int = _GEO_PRIORITY_CANDIDATE, *, detach: bool = True
+) -> Optional[tuple[float, float]]:
     """Best-effort forward geocode to lat/lon.
 
-    Uses Nominatim (no keys). Returns None on failure.
+    Uses Nominatim (no keys). Returns None on failure. Pass
+    `priority=_GEO_PRIORITY_USER` for lookups the user is directly waiting on,
+    and `detach=False` for speculative ones that should stop with their caller.
     """
 
     q = (place or "").strip()
     if not q:
         return None
+    key = _geocode_forward_key(q)
+    found, cached = await _geocode_cache_get(key)
+    if found:
+        return tuple(cached) if cached else None
+
+    try:
+        coords = await _singleflight(
+            "geocode",
+            key,
+            lambda: _forward_geocode_upstream(q, priority),
+            detach=detach,
+        )
+    except Exception:
+        return None
+    await _geocode_cache_put(key, list(coords) if coords else None)
+    return coords
+
+
+async def _forward_geocode_upstream(
+    q: str, priority: int = _GEO_PRIORITY_CANDIDATE
+) -> Optional[tuple[float, float]]:
+    """Nominatim search; None when nothing matches, raises when unavailable."""
 
-    url = f"{NOMINATIM_URL}/search"
     params = {
         "format": "jsonv2",
         "q": q,
         "limit": "1",
     }
-    headers = {
-        "Accept": "application/json",
-        "User-Agent": "fud-buddy-dev/1.0",
-        "Accept-Language": "en",
-    }
     try:
-        async with httpx.AsyncClient(timeout=6.0, follow_redirects=True) as client:
-            resp = await client.get(url, params=params, headers=headers)
-            if resp.status_code != 200:
-                return None
-            data = resp.json()
-            if not isinstance(data, list) or not data:
-                return None
-            top = data[0]
-            if not isinstance(top, dict):
-                return None
-            lat_raw = top.get("lat")
-            lon_raw = top.get("lon")
-            if lat_raw is None or lon_raw is None:
-                return None
-            lat = float(str(lat_raw))
-            lon = float(str(lon_raw))
-            if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
-                return None
-            return (lat, lon)
+        resp = await _nominatim.get("/search", params, priority=priority, timeout=6.0)
+    except _GeocodeUnavailable:
+        raise
+    except Exception as e:
+        raise _GeocodeUnavailable(str(e)) from e
+    if resp.status_code != 200:
+        raise _GeocodeUnavailable(f"nominatim status={resp.status_code}")
+    try:
+        data = resp.json()
+    except Exception as e:
+        raise _GeocodeUnavailable("nominatim returned invalid JSON") from e
+    try:
+        if not isinstance(data, list) or not data:
+            return None
+        top = data[0]
+        if not isinstance(top, dict):
+            return None
+        lat_raw = top.get("lat")
+        lon_raw = top.get("lon")
+        if lat_raw is None or lon_raw is None:
+            return None
+        lat = float(str(lat_raw))
+        lon = float(str(lon_raw))
+        if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
+            return None
+        return (lat, lon)
     except Exception:
         return None
 
 
+# Spatial index of restaurants we've already located (name + address -> lat/lon),
+# bucketed into a lat/lon grid so distance checks and "within N km" queries are
+# answered from memory. Optionally persisted to SQLite and reloaded on startup.
+PLACE_INDEX_PATH = os.getenv("PLACE_INDEX_PATH", "").strip()
+PLACE_INDEX_MAX_ENTRIES = int(os.getenv("PLACE_INDEX_MAX_ENTRIES", "20000"))
+# ~5.5 km cells: a 2 km urban radius touches at most a handful of buckets.
+PLACE_INDEX_CELL_DEG = _env_float("PLACE_INDEX_CELL_DEG", 0.05)
+# Restaurants close and move: persisted entries not re-located within this go.
+PLACE_INDEX_MAX_AGE_S = _env_float("PLACE_INDEX_MAX_AGE_S", 15552000.0)
+_PLACE_INDEX_PRUNE_INTERVAL_S = 600.0
+
+
+class _PlaceIndex:
+    def __init__(
+        self, cell_deg: float, max_entries: int, store: Optional[_SqliteKV]
+    ) -> None:
+        self.cell_deg = cell_deg if cell_deg > 0 else 0.05
+        self.max_entries = max(1, max_entries)
+        self.store = store
+        self.entries: "OrderedDict[str, dict]" = OrderedDict()
+        self.cells: dict[tuple[int, int], set[str]] = {}
+        # Normalised name -> keys, for picks whose address differs from the indexed one.
+        self.names: dict[str, set[str]] = {}
+        self.stats = {
+            "hits": 0,
+            "nameHits": 0,
+            "misses": 0,
+            "added": 0,
+            "nearbyQueries": 0,
+            "pruned": 0,
+        }
+        self.pruned_at = 0.0
+
+    @staticmethod
+    def key(name: str, address: str) -> str:
+        norm = re.sub(r"[^\w\s]", " ", f"{name} {address}".lower())
+        return re.sub(r"\s+", " ", norm).strip()
+
+    def _cell(self, lat: float, lon: float) -> tuple[int, int]:
+        return (math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+
+    def _drop(self, key: str) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        cell = self._cell(entry["lat"], entry["lon"])
+        bucket = self.cells.get(cell)
+        if bucket is not None:
+            bucket.discard(key)
+            if not bucket:
+                del self.cells[cell]
+        name = self.key(entry["name"], "")
+        same = self.names.get(name)
+        if same is not None:
+            same.discard(key)
+            if not same:
+                del self.names[name]
+
+    def _insert(self, key: str, entry: dict) -> None:
+        self._drop(key)
+        self.entries[key] = entry
+        self.cells.setdefault(self._cell(entry["lat"], entry["lon"]), set()).add(key)
+        self.names.setdefault(self.key(entry["name"], ""), set()).add(key)
+        while len(self.entries) > self.max_entries:
+            self._drop(next(iter(self.entries)))
+
+    def load(self) -> None:
+        """Blocking; reloads persisted entries (oldest first, so LRU order holds)."""
+
+        if self.store is None:
+            return
+        self.prune(time.time())
+        for key, _, entry in sorted(self.store.items(), key=lambda r: r[1]):
+            if isinstance(entry, dict) and "lat" in entry and "lon" in entry:
+                self._insert(key, entry)
+
+    def prune(self, now: float) -> None:
+        """Blocking; caps the persisted store at max_entries / PLACE_INDEX_MAX_AGE_S
+        (at most every few minutes)."""
+
+        if self.store is None or now - self.pruned_at < _PLACE_INDEX_PRUNE_INTERVAL_S:
+            return
+        self.pruned_at = now
+        self.stats["pruned"] += self.store.prune(
+            self.max_entries, PLACE_INDEX_MAX_AGE_S, now
+        )
+
+    def get(self, name: str, address: str) -> Optional[tuple[float, float]]:
+        key = self.key(name, address)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        self.entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return (entry["lat"], entry["lon"])
+
+    def nearest_named(
+        self, name: str, origin: tuple[float, float]
+    ) -> Optional[tuple[tuple[float, float], float]]:
+        """Closest indexed place with this name (any address), and its distance."""
+
+        best: Optional[tuple[tuple[float, float], float]] = None
+        for key in self.names.get(self.key(name, ""), ()):
+            entry = self.entries[key]
+            coords = (entry["lat"], entry["lon"])
+            d = _haversine_km(origin, coords)
+            if best is None or d < best[1]:
+                best = (coords, d)
+        return best
+
+    def add(
+        self, name: str, address: str, coords: tuple[float, float]
+    ) -> tuple[str, dict]:
+        key = self.key(name, address)
+        entry = {
+            "name": name,
+            "address": address,
+            "lat": float(coords[0]),
+            "lon": float(coords[1]),
+        }
+        self._insert(key, entry)
+        self.stats["added"] += 1
+        return key, entry
+
+    def nearby(
+        self, origin: tuple[float, float], km: float, limit: int = 50
+    ) -> list[dict]:
+        """Known restaurants within `km` of origin, nearest first."""
+
+        self.stats["nearbyQueries"] += 1
+        lat, lon = origin
+        dlat = km / 111.0
+        dlon = km / (111.0 * max(0.01, math.cos(math.radians(lat))))
+        lat0, lon0 = self._cell(lat - dlat, lon - dlon)
+        lat1, lon1 = self._cell(lat + dlat, lon + dlon)
+
+        # Wide radii over a sparse index: scanning the occupied cells is cheaper
+        # than probing every cell in the bounding box.
+        if (lat1 - lat0 + 1) * (lon1 - lon0 + 1) > len(self.cells):
+            cells = [
+                c for c in self.cells if lat0 <= c[0] <= lat1 and lon0 <= c[1] <= lon1
+            ]
+        else:
+            cells = [
+                (a, b) for a in range(lat0, lat1 + 1) for b in range(lon0, lon1 + 1)
+            ]
+
+        found: list[dict] = []
+        for cell in cells:
+            for key in self.cells.get(cell, ()):
+                entry = self.entries[key]
+                d = _haversine_km(origin, (entry["lat"], entry["lon"]))
+                if d <= km:
+                    found.append({**entry, "distanceKm": round(d, 3)})
+        found.sort(key=lambda e: e["distanceKm"])
+        return found[:limit]
+
+    def info(self) -> dict:
+        return {
+            **self.stats,
+            "entries": len(self.entries),
+            "cells": len(self.cells),
+            "persistent": self.store is not None,
+        }
+
+
+_place_index = _PlaceIndex(
+    PLACE_INDEX_CELL_DEG,
+    PLACE_INDEX_MAX_ENTRIES,
+    _SqliteKV(PLACE_INDEX_PATH, "place_index") if PLACE_INDEX_PATH else None,
+)
+
+
+async def _place_index_add(
+    name: str, address: str, coords: tuple[float, float]
+) -> None:
+    key, entry = _place_index.add(name, address, coords)
+    if _place_index.store is not None:
+        now = time.time()
+        try:
+            await asyncio.to_thread(_place_index.store.put, key, entry, now)
+            await asyncio.to_thread(_place_index.prune, now)
+        except Exception:
+            pass
+
+
+# Candidate pool: restaurant names pulled from search-result titles are located
+# and distance-checked before the model runs, so it picks from places already
+# known to be in range instead of being re-prompted at a wider radius.
+CANDIDATE_POOL = os.getenv("CANDIDATE_POOL", "1") == "1"
+CANDIDATE_POOL_MAX_LOOKUPS = int(os.getenv("CANDIDATE_POOL_MAX_LOOKUPS", "8"))
+CANDIDATE_POOL_TIMEOUT_S = _env_float("CANDIDATE_POOL_TIMEOUT_S", 3.0)
+CANDIDATE_POOL_SIZE = int(os.getenv("CANDIDATE_POOL_SIZE", "6"))
+
+_TITLE_SEGMENT_RE = re.compile(r"\s+[-–—|·:]\s+|\s*\|\s*|,\s+")
+_NOT_A_NAME_RE = re.compile(
+    r"\?|\b(?:best|top|\d+|restaurants|places|guide|reviews?|menu|near|"
+    r"things to do|where|how|what|why|list|updated|tripadvisor|yelp|reddit|"
+    r"opentable|google|facebook|instagram|home)\b",
+    re.IGNORECASE,
+)
+
+
+def _haversine_many(
+    origin: tuple[float, float], points: list[tuple[float, float]]
+) -> list[float]:
+    """Distances (km) from origin to every point; origin terms computed once."""
+
+    lat1 = math.radians(origin[0])
+    lon1 = math.radians(origin[1])
+    cos1 = math.cos(lat1)
+    out: list[float] = []
+    for lat, lon in points:
+        lat2 = math.radians(lat)
+        x = (
+            math.sin((lat2 - lat1) / 2) ** 2
+            + cos1 * math.cos(lat2) * math.sin((math.radians(lon) - lon1) / 2) ** 2
+        )
+        out.append(2 * 6371.0 * math.asin(min(1.0, math.sqrt(x))))
+    return out
+
+
+def _extract_candidate_names(
+    results: list[dict], location: str, limit: int
+) -> list[str]:
+    """Restaurant-looking names from result titles, most-mentioned first.
+
+    Takes the leading title segment ("Bar Isabel - Toronto - Yelp" -> "Bar Isabel")
+    and drops listicles, site names and anything naming the location itself.
+    """
+
+    loc_tokens = {t for t in _PlaceIndex.key(location, "").split() if len(t) > 2}
+    counts: dict[str, int] = {}
+    names: dict[str, str] = {}
+    for r in results:
+        title = str(r.get("title") or "").strip()
+        if not title:
+            continue
+        name = _TITLE_SEGMENT_RE.split(title, maxsplit=1)[0].strip(" .'\"")
+        if not (2 < len(name) <= 60) or len(name.split()) > 6:
+            continue
+        if name.islower() or _NOT_A_NAME_RE.search(name):
+            continue
+        key = _PlaceIndex.key(name, "")
+        if not key or loc_tokens & set(key.split()):
+            continue
+        counts[key] = counts.get(key, 0) + 1
+        names.setdefault(key, name)
+    # Stable sort: ties keep search order.
+    ranked = sorted(names, key=lambda k: -counts[k])
+    return [names[k] for k in ranked[:limit]]
+
+
+async def _verified_candidates(
+    results: list[dict], location: str, origin: tuple[float, float], km: float
+) -> list[dict]:
+    """Restaurants named in `results` that are confirmed within `km` of origin.
+
+    Names already in the place index are answered from memory; the rest are
+    geocoded concurrently until CANDIDATE_POOL_TIMEOUT_S. Lookups still running
+    at the deadline are cancelled; they run at the lowest Nominatim priority so
+    they never hold up distance checks for picks already made.
+    """
+
+    located: dict[str, tuple[str, tuple[float, float]]] = {}
+
+    # Indexed restaurants near origin that the results talk about need no lookup.
+    blob = " ".join(
+        _PlaceIndex.key(str(r.get("title") or ""), str(r.get("content") or ""))
+        for r in results
+    )
+    for e in _place_index.nearby(origin, km, limit=CANDIDATE_POOL_SIZE * 4):
+        key = _PlaceIndex.key(e["name"], "")
+        if key and f" {key} " in f" {blob} ":
+            located[key] = (e["name"], (e["lat"], e["lon"]))
+
+    async def _locate(name: str) -> Optional[tuple[float, float]]:
+        coords = await _forward_geocode(
+            f"{name}, {location}", _GEO_PRIORITY_PREFETCH, detach=False
+        )
+        if coords is not None:
+            await _place_index_add(name, location, coords)
+        return coords
+
+    lookups: dict[asyncio.Task, str] = {}
+    for name in _extract_candidate_names(results, location, CANDIDATE_POOL_MAX_LOOKUPS):
+        key = _PlaceIndex.key(name, "")
+        if key in located:
+            continue
+        coords = _place_index.get(name, location)
+        if coords is not None:
+            located[key] = (name, coords)
+            continue
+        lookups[asyncio.create_task(_locate(name))] = name
+
+    if lookups:
+        done, pending = await asyncio.wait(lookups, timeout=CANDIDATE_POOL_TIMEOUT_S)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            coords = None if task.exception() else task.result()
+            if coords is not None:
+                name = lookups[task]
+                located[_PlaceIndex.key(name, "")] = (name, coords)
+
+    if not located:
+        return []
+    entries = list(located.values())
+    dists = _haversine_many(origin, [c for _, c in entries])
+    nearby = sorted(
+        (
+            {
+                "name": name,
+                "lat": coords[0],
+                "lon": coords[1],
+                "distanceKm": round(d, 3),
+            }
+            for (name, coords), d in zip(entries, dists)
+            if d <= km
+        ),
+        key=lambda c: c["distanceKm"],
+    )
+    return nearby[:CANDIDATE_POOL_SIZE]
+
+
 def _extract_json_array(text: str) -> Optional[list]:
     # Find the first JSON array in the text.
     import re
@@ -1068,85 +3599,495 @@ def _pop_first_json_object(text: str) -> tuple[Optional[str], str]:
                 return obj_text, remaining
             continue
 
-    return None, text
+    return None, text
+
+
+class _JsonObjectScanner:
+    """Stateful scanner for the first JSON object in streamed model output.
+
+    Unlike `_pop_first_json_object`, each `feed()` only scans the new text. It
+    tracks key paths so callers can act on fields as soon as their values close
+    (e.g. `("restaurant", "name")` before the rest of the object arrives).
+    """
+
+    def __init__(self) -> None:
+        self.buf = ""
+        self.done = False
+        self.value: Any = None
+        self._pos = 0
+        self._start = -1
+        self._in_string = False
+        self._escape = False
+        self._str_start = -1
+        # One frame per open container: kind, key path, pending key, scalar start.
+        self._stack: list[dict] = []
+
+    @property
+    def text(self) -> str:
+        if self._start < 0:
+            return ""
+        return self.buf[self._start : self._pos]
+
+    def _complete(
+        self, frame: dict, start: int, end: int, out: list[tuple[tuple, Any]]
+    ) -> None:
+        if frame["kind"] != "{" or frame["key"] is None:
+            return
+        try:
+            value = json.loads(self.buf[start:end])
+        except Exception:
+            return
+        out.append((frame["path"] + (frame["key"],), value))
+
+    def _flush_scalar(
+        self, frame: dict, end: int, out: list[tuple[tuple, Any]]
+    ) -> None:
+        if frame["scalar"] >= 0:
+            self._complete(frame, frame["scalar"], end, out)
+            frame["scalar"] = -1
+
+    def feed(self, chunk: str) -> list[tuple[tuple, Any]]:
+        """Consume more text; return fields whose values completed in it."""
+
+        out: list[tuple[tuple, Any]] = []
+        if self.done or not chunk:
+            return out
+
+        self.buf += chunk
+        buf = self.buf
+        for i in range(self._pos, len(buf)):
+            ch = buf[i]
+            if self._start < 0:
+                if ch == "{":
+                    self._start = i
+                    self._stack.append(
+                        {
+                            "kind": "{",
+                            "path": (),
+                            "key": None,
+                            "expect_key": True,
+                            "scalar": -1,
+                            "start": i,
+                        }
+                    )
+                continue
+
+            frame = self._stack[-1]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if frame["kind"] == "{" and frame["expect_key"]:
+                        try:
+                            frame["key"] = json.loads(buf[self._str_start : i + 1])
+                        except Exception:
+                            frame["key"] = None
+                    else:
+                        self._complete(frame, self._str_start, i + 1, out)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._str_start = i
+            elif ch in "{[":
+                path = frame["path"]
+                if frame["kind"] == "{" and frame["key"] is not None:
+                    path = path + (frame["key"],)
+                self._stack.append(
+                    {
+                        "kind": ch,
+                        "path": path,
+                        "key": None,
+                        "expect_key": ch == "{",
+                        "scalar": -1,
+                        "start": i,
+                    }
+                )
+            elif ch in "}]":
+                self._flush_scalar(frame, i, out)
+                self._stack.pop()
+                if not self._stack:
+                    self._pos = i + 1
+                    self.done = True
+                    try:
+                        self.value = json.loads(buf[self._start : i + 1])
+                    except Exception:
+                        self.value = None
+                    return out
+                self._complete(self._stack[-1], frame["start"], i + 1, out)
+            elif ch == ":":
+                frame["expect_key"] = False
+            elif ch == ",":
+                self._flush_scalar(frame, i, out)
+                if frame["kind"] == "{":
+                    frame["expect_key"] = True
+                    frame["key"] = None
+            elif not ch.isspace() and frame["scalar"] < 0:
+                frame["scalar"] = i
+
+        self._pos = len(buf)
+        return out
+
+
+def _maps_links(name: str, address: str) -> dict:
+    q = " ".join([p for p in [name.strip(), address.strip()] if p]).strip()
+    if not q:
+        return {"google": "", "apple": ""}
+    enc = quote_plus(q)
+    return {
+        "google": f"https://www.google.com/maps/search/?api=1&query={enc}",
+        "apple": f"http://maps.apple.com/?q={enc}",
+    }
+
+
+def _generate_outfit(vibe: str, place: str, main: str) -> str:
+    """Generate a fun, fake outfit line.
+
+    Keep it short, playful, and relevant to food/venue.
+    """
+
+    v = (vibe or "").strip().lower()
+    p = (place or "").strip()
+    dish = (main or "").strip()
+
+    if not dish:
+        dish = "whatever you end up devouring"
+
+    if any(k in v for k in ("date", "romance", "fancy", "dress")):
+        return f"Date-night armor: a clean fit, one little statement piece, and shoes you can actually walk in after {dish}."
+    if any(k in v for k in ("cozy", "chill", "comfort")):
+        return f"Cozy-core: soft layers and sneakers you trust. You’re here for {dish}, not foot pain."
+    if any(k in v for k in ("street", "loud", "party", "club")):
+        return f"Street-ready: jacket with pockets, sneakers with grip, and a fit that can survive a joyful encounter with {dish}."
+    if any(k in v for k in ("rain", "wet", "storm")):
+        return f"Weather-proof drip: waterproof layer + grippy shoes. You’re not letting rain stop you from {dish}."
+    return f"Wear something comfy-cute. {p} is the vibe; {dish} is the mission."
+
+
+# og:image lookups stream only the page's <head> (stopping at </head>, <body> or
+# OG_IMAGE_MAX_BYTES) and are cached per URL, including "no image" answers.
+OG_IMAGE_MAX_BYTES = int(os.getenv("OG_IMAGE_MAX_BYTES", "262144"))
+OG_IMAGE_CACHE_TTL_S = _env_float("OG_IMAGE_CACHE_TTL_S", 86400.0)
+OG_IMAGE_NEGATIVE_TTL_S = _env_float("OG_IMAGE_NEGATIVE_TTL_S", 3600.0)
+OG_IMAGE_CACHE_MAX_ENTRIES = int(os.getenv("OG_IMAGE_CACHE_MAX_ENTRIES", "2000"))
+
+_og_cache: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+_og_stats = {
+    "hits": 0,
+    "negativeHits": 0,
+    "misses": 0,
+    "fetches": 0,
+    "bytesRead": 0,
+    "stoppedEarly": 0,
+}
+
+
+class _OgImageScanner:
+    """Incremental scan of a page's <head> for og:image / twitter:image.
+
+    Feed decoded text as it arrives; `done` is set once og:image is found or the
+    head has ended. Only a trailing partial tag is kept between chunks.
+    """
+
+    _META_RE = re.compile(r"<meta\b[^>]*>", re.IGNORECASE)
+    _HEAD_END_RE = re.compile(r"</head\s*>|<body\b", re.IGNORECASE)
+
+    def __init__(self) -> None:
+        self.buf = ""
+        self.og = ""
+        self.twitter = ""
+        self.done = False
+
+    @property
+    def image(self) -> str:
+        return self.og or self.twitter
+
+    @staticmethod
+    def _content(tag: str) -> str:
+        mc = re.search(r'content=["\']([^"\']+)["\']', tag, re.IGNORECASE)
+        return html.unescape(mc.group(1).strip()) if mc else ""
+
+    def feed(self, text: str) -> bool:
+        self.buf += text
+        end = self._HEAD_END_RE.search(self.buf)
+        head = self.buf[: end.start()] if end else self.buf
+        last = 0
+        for mt in self._META_RE.finditer(head):
+            last = mt.end()
+            tag = mt.group(0)
+            if re.search(r'property=["\']og:image["\']', tag, re.IGNORECASE):
+                self.og = self.og or self._content(tag)
+            elif re.search(r'name=["\']twitter:image["\']', tag, re.IGNORECASE):
+                self.twitter = self.twitter or self._content(tag)
+            if self.og:
+                self.done = True
+                return True
+        if end:
+            self.done = True
+            return True
+        cut = self.buf.rfind("<", last)
+        self.buf = self.buf[cut:] if cut != -1 else ""
+        return False
+
+
+async def _og_image_from_url(url: str) -> str:
+    if not url:
+        return ""
+
+    hit = _og_cache.get(url)
+    if hit is not None:
+        stored_at, img = hit
+        ttl = OG_IMAGE_CACHE_TTL_S if img else OG_IMAGE_NEGATIVE_TTL_S
+        if time.time() - stored_at <= ttl:
+            _og_cache.move_to_end(url)
+            _og_stats["hits" if img else "negativeHits"] += 1
+            return img
+        _og_cache.pop(url, None)
+    _og_stats["misses"] += 1
+
+    try:
+        img = await _singleflight("og", url, lambda: _og_image_fetch(url))
+    except Exception:
+        return ""  # transient (network, 5xx): not cached
+    _og_cache.pop(url, None)
+    _og_cache[url] = (time.time(), img)
+    while len(_og_cache) > OG_IMAGE_CACHE_MAX_ENTRIES:
+        _og_cache.popitem(last=False)
+    return img
+
+
+async def _og_image_fetch(url: str) -> str:
+    """Stream the page until its head is scanned; raises on transient failures."""
+
+    _og_stats["fetches"] += 1
+    scanner = _OgImageScanner()
+    read = 0
+    async with _http_client("web").stream(
+        "GET", url, headers={"Accept": "text/html"}, timeout=6.0
+    ) as resp:
+        if resp.status_code >= 500:
+            raise httpx.HTTPStatusError(
+                f"status {resp.status_code}", request=resp.request, response=resp
+            )
+        if resp.status_code != 200:
+            return ""
+        try:
+            decoder = codecs.getincrementaldecoder(resp.charset_encoding or "utf-8")(
+                errors="replace"
+            )
+        except LookupError:
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+        async for chunk in resp.aiter_bytes():
+            read += len(chunk)
+            if scanner.feed(decoder.decode(chunk)) or read >= OG_IMAGE_MAX_BYTES:
+                # Leaving the stream early closes the connection on the rest.
+                _og_stats["stoppedEarly"] += 1
+                break
+        else:
+            scanner.feed(decoder.decode(b"", final=True))
+    _og_stats["bytesRead"] += read
+    return scanner.image
+
+
+def _og_cache_info() -> dict:
+    return {**_og_stats, "entries": len(_og_cache)}
+
+
+# Google Places cache, two tiers: a bounded in-memory LRU in front of a durable
+# store (Postgres when DATABASE_URL is set, else SQLite at GOOGLE_PLACES_CACHE_PATH).
+# name+location -> place_id mappings are kept separately and much longer than
+# details, so refreshing stale details costs one paid call instead of two.
+GOOGLE_PLACE_ID_CACHE_DAYS = int(os.getenv("GOOGLE_PLACE_ID_CACHE_DAYS", "365"))
+GOOGLE_PLACES_NEGATIVE_TTL_S = _env_float("GOOGLE_PLACES_NEGATIVE_TTL_S", 86400.0)
+GOOGLE_PLACES_CACHE_MAX_ENTRIES = int(
+    os.getenv("GOOGLE_PLACES_CACHE_MAX_ENTRIES", "2000")
+)
+GOOGLE_PLACES_CACHE_PATH = os.getenv("GOOGLE_PLACES_CACHE_PATH", "").strip()
+
+_places_cache: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+_places_store = (
+    _SqliteKV(GOOGLE_PLACES_CACHE_PATH, "places_cache")
+    if GOOGLE_PLACES_CACHE_PATH
+    else None
+)
+_places_stats = {
+    "hits": 0,
+    "negativeHits": 0,
+    "misses": 0,
+    "storeHits": 0,
+    "findPlaceCalls": 0,
+    "detailsCalls": 0,
+    "pruned": 0,
+}
+_PLACES_PRUNE_INTERVAL_S = 600.0
+_places_pruned_at = 0.0
 
 
-def _maps_links(name: str, address: str) -> dict:
-    q = " ".join([p for p in [name.strip(), address.strip()] if p]).strip()
-    if not q:
-        return {"google": "", "apple": ""}
-    enc = quote_plus(q)
-    return {
-        "google": f"https://www.google.com/maps/search/?api=1&query={enc}",
-        "apple": f"http://maps.apple.com/?q={enc}",
-    }
+def _places_id_key(name: str, location: str) -> str:
+    norm = re.sub(r"[^\w\s]", " ", f"{name}:{location}".lower())
+    return "id:" + re.sub(r"\s+", " ", norm).strip()
 
 
-def _generate_outfit(vibe: str, place: str, main: str) -> str:
-    """Generate a fun, fake outfit line.
+def _places_remember(key: str, stored_at: float, value: Any) -> None:
+    _places_cache.pop(key, None)
+    _places_cache[key] = (stored_at, value)
+    while len(_places_cache) > GOOGLE_PLACES_CACHE_MAX_ENTRIES:
+        _places_cache.popitem(last=False)
 
-    Keep it short, playful, and relevant to food/venue.
-    """
 
-    v = (vibe or "").strip().lower()
-    p = (place or "").strip()
-    dish = (main or "").strip()
+async def _places_store_get(key: str) -> Optional[tuple[float, Any]]:
+    if db_pool is not None:
+        async with db_pool.connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    # As text: psycopg decodes jsonb, and a cached place_id is a
+                    # bare JSON string that json.loads could no longer parse.
+                    "select stored_at, value::text from fud_places_cache"
+                    " where key = %s",
+                    (key,),
+                )
+                row = await cur.fetchone()
+        if row is None:
+            return None
+        return float(row[0]), json.loads(row[1])
+    if _places_store is not None:
+        return await asyncio.to_thread(_places_store.get, key)
+    return None
 
-    if not dish:
-        dish = "whatever you end up devouring"
 
-    if any(k in v for k in ("date", "romance", "fancy", "dress")):
-        return f"Date-night armor: a clean fit, one little statement piece, and shoes you can actually walk in after {dish}."
-    if any(k in v for k in ("cozy", "chill", "comfort")):
-        return f"Cozy-core: soft layers and sneakers you trust. You’re here for {dish}, not foot pain."
-    if any(k in v for k in ("street", "loud", "party", "club")):
-        return f"Street-ready: jacket with pockets, sneakers with grip, and a fit that can survive a joyful encounter with {dish}."
-    if any(k in v for k in ("rain", "wet", "storm")):
-        return f"Weather-proof drip: waterproof layer + grippy shoes. You’re not letting rain stop you from {dish}."
-    return f"Wear something comfy-cute. {p} is the vibe; {dish} is the mission."
+async def _places_store_put(key: str, value: Any, stored_at: float) -> None:
+    if db_pool is not None:
+        async with db_pool.connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    """
+                    insert into fud_places_cache (key, stored_at, value)
+                    values (%s, %s, %s)
+                    on conflict (key) do update
+                    set stored_at = excluded.stored_at, value = excluded.value
+                    """,
+                    (key, stored_at, json.dumps(value)),
+                )
+            await conn.commit()
+    elif _places_store is not None:
+        await asyncio.to_thread(_places_store.put, key, value, stored_at)
+    await _places_store_prune(stored_at)
 
 
-async def _og_image_from_url(url: str) -> str:
-    if not url:
-        return ""
+async def _places_store_prune(now: float) -> None:
+    """Delete durable rows past their TTL (at most every few minutes)."""
+
+    global _places_pruned_at
+    if now - _places_pruned_at < _PLACES_PRUNE_INTERVAL_S:
+        return
+    _places_pruned_at = now
+    cutoffs = (
+        now - GOOGLE_PLACES_NEGATIVE_TTL_S,
+        now - GOOGLE_PLACE_ID_CACHE_DAYS * 86400.0,
+        now - GOOGLE_PLACES_CACHE_DAYS * 86400.0,
+    )
+    # Misses, place_id mappings and details each expire on their own TTL.
+    if db_pool is not None:
+        async with db_pool.connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    """
+                    delete from fud_places_cache where stored_at < case
+                      when value = 'null'::jsonb then %s
+                      when key like 'id:%%' then %s
+                      else %s
+                    end
+                    """,
+                    cutoffs,
+                )
+                deleted = cur.rowcount
+            await conn.commit()
+    elif _places_store is not None:
+        deleted = await asyncio.to_thread(
+            _places_store.delete_where,
+            """
+            delete from places_cache where stored_at < case
+              when value = 'null' then ?
+              when key like 'id:%' then ?
+              else ?
+            end
+            """,
+            cutoffs,
+        )
+    else:
+        return
+    _places_stats["pruned"] += max(0, deleted)
+
 
+async def _places_cache_get(key: str, ttl_s: float) -> tuple[bool, Any]:
+    """Return (found, value); a None value is a cached "no such place"."""
+
+    hit = _places_cache.get(key)
+    if hit is None:
+        try:
+            hit = await _places_store_get(key)
+        except Exception:
+            hit = None
+        if hit is not None:
+            _places_stats["storeHits"] += 1
+            _places_remember(key, *hit)
+
+    if hit is not None:
+        stored_at, value = hit
+        negative = value is None
+        if time.time() - stored_at <= (
+            GOOGLE_PLACES_NEGATIVE_TTL_S if negative else ttl_s
+        ):
+            _places_cache.move_to_end(key)
+            _places_stats["negativeHits" if negative else "hits"] += 1
+            return True, value
+        _places_cache.pop(key, None)
+
+    _places_stats["misses"] += 1
+    return False, None
+
+
+async def _places_cache_put(
+    key: str, value: Any, stored_at: Optional[float] = None
+) -> None:
+    stored_at = time.time() if stored_at is None else stored_at
+    _places_remember(key, stored_at, value)
     try:
-        async with httpx.AsyncClient(timeout=6.0, follow_redirects=True) as client:
-            resp = await client.get(url, headers={"Accept": "text/html"})
-            if resp.status_code != 200:
-                return ""
-            page_html = resp.text
+        await _places_store_put(key, value, stored_at)
     except Exception:
-        return ""
-
-    # Very small best-effort parse (no deps).
-    def _extract_from_meta(tag_regex: str) -> str:
-        mt = re.search(tag_regex, page_html, re.IGNORECASE)
-        if not mt:
-            return ""
-        tag = mt.group(0)
-        mc = re.search(r'content=["\']([^"\']+)["\']', tag, re.IGNORECASE)
-        if not mc:
-            return ""
-        return html.unescape(mc.group(1).strip())
+        pass
 
-    # Look for a meta tag that identifies the image type, then pull its content.
-    og = _extract_from_meta(r'<meta[^>]+property=["\']og:image["\'][^>]*>')
-    if og:
-        return og
 
-    tw = _extract_from_meta(r'<meta[^>]+name=["\']twitter:image["\'][^>]*>')
-    if tw:
-        return tw
-    return ""
+def _places_cache_info() -> dict:
+    return {
+        **_places_stats,
+        "entries": len(_places_cache),
+        "store": (
+            "postgres"
+            if db_pool is not None
+            else "sqlite" if _places_store is not None else None
+        ),
+    }
 
 
-# Google Places cache (in-memory for now, should use Redis/DB in production)
-_places_cache: dict[str, dict] = {}
+def _places_with_photo_url(place_data: dict) -> dict:
+    ref = place_data.get("photo_reference")
+    photo_url = (
+        f"https://maps.googleapis.com/maps/api/place/photo?maxwidth=800&photoreference={ref}&key={GOOGLE_PLACES_API_KEY}"
+        if ref
+        else ""
+    )
+    return {**place_data, "photo_url": photo_url}
 
 
 async def _get_place_from_google(
-    restaurant_name: str, location: str, client: httpx.AsyncClient
+    restaurant_name: str,
+    location: str,
+    client: Optional[httpx.AsyncClient] = None,
 ) -> Optional[dict]:
     """Get restaurant details from Google Places API with caching.
 
@@ -1154,17 +4095,47 @@ async def _get_place_from_google(
     """
     if not GOOGLE_PLACES_API_KEY:
         return None
+    if client is None:
+        client = _http_client("google")
 
-    cache_key = f"{restaurant_name.lower()}:{location.lower()}"
-
-    # Check cache first
-    if cache_key in _places_cache:
-        cached = _places_cache[cache_key]
-        cache_age_days = (time.time() - cached.get("_cached_at", 0)) / 86400
-        if cache_age_days < GOOGLE_PLACES_CACHE_DAYS:
-            return cached
+    id_key = _places_id_key(restaurant_name, location)
+    known, place_id = await _places_cache_get(
+        id_key, GOOGLE_PLACE_ID_CACHE_DAYS * 86400.0
+    )
+    if known and place_id is None:
+        return None
+    if known:
+        found, cached = await _places_cache_get(
+            f"details:{place_id}", GOOGLE_PLACES_CACHE_DAYS * 86400.0
+        )
+        # Entries written before photo references were cached carry a keyed URL:
+        # refetch so it gets overwritten.
+        if found and isinstance(cached, dict) and "photo_reference" in cached:
+            return _places_with_photo_url(cached)
 
     try:
+        return await _singleflight(
+            "places",
+            id_key,
+            lambda: _get_place_from_google_upstream(
+                restaurant_name, location, id_key, place_id, client
+            ),
+        )
+    except Exception as e:
+        print(f"Google Places error for {restaurant_name}: {e}")
+        return None
+
+
+async def _get_place_from_google_upstream(
+    restaurant_name: str,
+    location: str,
+    id_key: str,
+    place_id: Optional[str],
+    client: httpx.AsyncClient,
+) -> Optional[dict]:
+    """Places lookup (skipped when place_id is known) + details; fills the cache."""
+
+    if not place_id:
         # Step 1: Find place ID
         search_url = "https://maps.googleapis.com/maps/api/place/findplacefromtext/json"
         search_params = {
@@ -1174,78 +4145,78 @@ async def _get_place_from_google(
             "key": GOOGLE_PLACES_API_KEY,
         }
 
+        _places_stats["findPlaceCalls"] += 1
         resp = await client.get(search_url, params=search_params, timeout=10.0)
         data = resp.json()
 
+        if data.get("status") == "ZERO_RESULTS":
+            await _places_cache_put(id_key, None)
+            return None
         if data.get("status") != "OK" or not data.get("candidates"):
             return None
 
-        place_id = data["candidates"][0]["place_id"]
+        place_id = str(data["candidates"][0]["place_id"])
+        await _places_cache_put(id_key, place_id)
 
-        # Step 2: Get place details including photos and reviews
-        details_url = "https://maps.googleapis.com/maps/api/place/details/json"
-        details_params = {
-            "place_id": place_id,
-            "fields": "photos,reviews,price_level,rating,website,formatted_address",
-            "key": GOOGLE_PLACES_API_KEY,
-        }
-
-        resp = await client.get(details_url, params=details_params, timeout=10.0)
-        data = resp.json()
+    # Step 2: Get place details including photos and reviews
+    details_url = "https://maps.googleapis.com/maps/api/place/details/json"
+    details_params = {
+        "place_id": place_id,
+        "fields": "photos,reviews,price_level,rating,website,formatted_address",
+        "key": GOOGLE_PLACES_API_KEY,
+    }
 
-        if data.get("status") != "OK":
-            return None
+    _places_stats["detailsCalls"] += 1
+    resp = await client.get(details_url, params=details_params, timeout=10.0)
+    data = resp.json()
 
-        result = data.get("result", {})
-
-        # Extract photo URL
-        photo_url = ""
-        photos = result.get("photos", [])
-        if photos:
-            photo_ref = photos[0].get("photo_reference")
-            if photo_ref:
-                photo_url = f"https://maps.googleapis.com/maps/api/place/photo?maxwidth=800&photoreference={photo_ref}&key={GOOGLE_PLACES_API_KEY}"
-
-        # Extract menu items from reviews
-        menu_items: list[str] = []
-        reviews = result.get("reviews", [])
-        for review in reviews[:5]:  # Check top 5 reviews
-            text = review.get("text", "").lower()
-            # Look for mentions of specific dishes
-            patterns = [
-                r"(?:had|ate|ordered|tried)\s+(?:the\s+)?([a-z\s]{5,30}(?:pasta|pizza|burger|steak|salad|chicken|fish|tacos|sushi|ramen))",
-                r"(?:recommend|try)\s+(?:the\s+)?([a-z\s]{5,30}(?:pasta|pizza|burger|steak|salad))",
-            ]
-            for pattern in patterns:
-                matches = re.findall(pattern, text, re.IGNORECASE)
-                for match in matches:
-                    item = match.strip().title()
-                    if (
-                        item
-                        and len(item) > 5
-                        and len(item) < 35
-                        and item not in menu_items
-                    ):
-                        menu_items.append(item)
-
-        place_data = {
-            "photo_url": photo_url,
-            "menu_items": menu_items[:4],  # Top 4 items from reviews
-            "price_level": result.get("price_level"),
-            "rating": result.get("rating"),
-            "website": result.get("website"),
-            "address": result.get("formatted_address"),
-            "_cached_at": time.time(),
-        }
+    if data.get("status") == "NOT_FOUND":
+        # Place IDs can go stale; expire the mapping so the next call looks it up.
+        await _places_cache_put(id_key, place_id, stored_at=0.0)
+        return None
+    if data.get("status") != "OK":
+        return None
 
-        # Cache the result
-        _places_cache[cache_key] = place_data
+    result = data.get("result", {})
+
+    # Keep the photo reference; the keyed URL is built on the way out so the API
+    # key never lands in the durable cache.
+    photo_ref = ""
+    photos = result.get("photos", [])
+    if photos:
+        photo_ref = str(photos[0].get("photo_reference") or "")
+
+    # Extract menu items from reviews
+    menu_items: list[str] = []
+    reviews = result.get("reviews", [])
+    for review in reviews[:5]:  # Check top 5 reviews
+        text = review.get("text", "").lower()
+        # Look for mentions of specific dishes
+        patterns = [
+            r"(?:had|ate|ordered|tried)\s+(?:the\s+)?([a-z\s]{5,30}(?:pasta|pizza|burger|steak|salad|chicken|fish|tacos|sushi|ramen))",
+            r"(?:recommend|try)\s+(?:the\s+)?([a-z\s]{5,30}(?:pasta|pizza|burger|steak|salad))",
+        ]
+        for pattern in patterns:
+            matches = re.findall(pattern, text, re.IGNORECASE)
+            for match in matches:
+                item = match.strip().title()
+                if item and len(item) > 5 and len(item) < 35 and item not in menu_items:
+                    menu_items.append(item)
+
+    place_data = {
+        "photo_reference": photo_ref,
+        "menu_items": menu_items[:4],  # Top 4 items from reviews
+        "price_level": result.get("price_level"),
+        "rating": result.get("rating"),
+        "website": result.get("website"),
+        "address": result.get("formatted_address"),
+        "_cached_at": time.time(),
+    }
 
-        return place_data
+    # Cache the result
+    await _places_cache_put(f"details:{place_id}", place_data)
 
-    except Exception as e:
-        print(f"Google Places error for {restaurant_name}: {e}")
-        return None
+    return _places_with_photo_url(place_data)
 
 
 def _is_bad_source_url(url: str) -> bool:
@@ -1312,6 +4283,175 @@ def _is_bad_image_url(url: str) -> bool:
     return False
 
 
+# Image discovery strategies, most preferred first. _race_image_strategies runs
+# them together and keeps the best-ranked hit inside IMAGE_RACE_BUDGET_S.
+IMAGE_RACE_BUDGET_S = _env_float("IMAGE_RACE_BUDGET_S", 6.0)
+
+_image_strategy_stats: dict[str, dict[str, float]] = {}
+
+
+async def _image_from_official_site(name: str, address: str) -> str:
+    """og:image from the restaurant's own website."""
+
+    try:
+        query = f'"{name}" {address} official site -tripadvisor -yelp -google'
+        hits = await search_web(query)
+
+        for h in hits[:3]:
+            url = str(h.get("url") or "")
+            if url and not _is_bad_source_url(url):
+                img = await _og_image_from_url(url)
+                if img:
+                    return img
+    except Exception:
+        pass
+    return ""
+
+
+async def _image_from_review_sites(name: str) -> str:
+    """A food photo of this restaurant from a review site's image results."""
+
+    try:
+        query = f'"{name}" restaurant food photo'
+        imgs = await search_images(query)
+
+        for it in imgs[:10]:
+            src_url = str(it.get("url") or "").lower()
+            img_url = _pick_image_url(it)
+
+            if not img_url or _is_bad_image_url(img_url):
+                continue
+
+            # Check if it's from a relevant source
+            if any(
+                good in src_url for good in ["tripadvisor", "yelp", "blogto", "zomato"]
+            ):
+                # Avoid nature/landscape keywords
+                if not any(
+                    bad in img_url.lower()
+                    for bad in [
+                        "lake",
+                        "water",
+                        "beach",
+                        "forest",
+                        "mountain",
+                        "sunset",
+                        "sky",
+                    ]
+                ):
+                    return img_url
+    except Exception:
+        pass
+    return ""
+
+
+async def _image_from_source_pages(srcs: list[dict]) -> str:
+    """og:image from the search results the recommendation was grounded in."""
+
+    for s in srcs[:3]:
+        url = str(s.get("url") or "")
+        if url and not _is_bad_source_url(url):
+            img = await _og_image_from_url(url)
+            if img:
+                return img
+    return ""
+
+
+async def _race_image_strategies(
+    strategies: list[tuple[str, Any]], budget_s: Optional[float] = None
+) -> str:
+    """Run (name, coroutine) image strategies at once; return the preferred hit.
+
+    A hit is returned as soon as every more-preferred strategy has come back
+    empty; once the budget is spent the best hit so far wins. Strategies still
+    running at that point are cancelled.
+    """
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    deadline = started + (IMAGE_RACE_BUDGET_S if budget_s is None else budget_s)
+    names = [name for name, _ in strategies]
+    tasks = [asyncio.create_task(coro) for _, coro in strategies]
+    results: list[Optional[str]] = [None] * len(tasks)
+    latencies: list[Optional[float]] = [None] * len(tasks)
+
+    winner: Optional[int] = None
+    pending = set(tasks)
+    try:
+        while pending:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            done, pending = await asyncio.wait(
+                pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                i = tasks.index(task)
+                latencies[i] = loop.time() - started
+                img = None if task.exception() else task.result()
+                results[i] = img if isinstance(img, str) else ""
+
+            for i, img in enumerate(results):
+                if img is None:
+                    break  # a more preferred strategy may still come through
+                if img:
+                    winner = i
+                    break
+            if winner is not None:
+                break
+
+        if winner is None:
+            winner = next((i for i, img in enumerate(results) if img), None)
+    finally:
+        for task in pending:
+            task.cancel()
+
+    # Stats only for races that ran to the end: when the caller is cancelled
+    # mid-race, its legs didn't lose.
+    for i, name in enumerate(names):
+        stats = _image_strategy_stats.setdefault(
+            name,
+            {
+                "runs": 0,
+                "hits": 0,
+                "wins": 0,
+                "cancelled": 0,
+                "finished": 0,
+                "totalS": 0.0,
+            },
+        )
+        stats["runs"] += 1
+        latency = latencies[i]
+        if latency is None:
+            stats["cancelled"] += 1
+            continue
+        stats["finished"] += 1
+        stats["totalS"] += latency
+        if results[i]:
+            stats["hits"] += 1
+
+    if winner is None:
+        return ""
+    _image_strategy_stats[names[winner]]["wins"] += 1
+    return results[winner] or ""
+
+
+def _image_strategy_info() -> dict:
+    out: dict[str, dict] = {}
+    for name, st in _image_strategy_stats.items():
+        runs = int(st["runs"])
+        finished = int(st["finished"])
+        out[name] = {
+            "runs": runs,
+            "wins": int(st["wins"]),
+            "hits": int(st["hits"]),
+            "cancelled": int(st["cancelled"]),
+            "winRate": round(st["wins"] / runs, 3) if runs else 0.0,
+            "avgLatencyMs": round(st["totalS"] * 1000 / finished) if finished else None,
+        }
+    return out
+
+
 def _clean_snippet(text: str) -> str:
     s = text or ""
     # Some engines include highlight markers.
@@ -1320,6 +4460,160 @@ def _clean_snippet(text: str) -> str:
     return s
 
 
+def _estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 chars/token for English prose and URLs)."""
+
+    return (len(text or "") + 3) // 4
+
+
+def _prompt_token_budget(provider: str, model: str) -> int:
+    for k in (model, provider):
+        if k in PROMPT_TOKEN_BUDGETS:
+            return PROMPT_TOKEN_BUDGETS[k]
+    return PROMPT_TOKEN_BUDGET
+
+
+_PREF_STOPWORDS = {"any", "none", "good", "food", "and", "the", "with"}
+
+
+def _preference_terms(*values: str) -> list[str]:
+    terms: list[str] = []
+    for v in values:
+        for t in re.split(r"[^a-z0-9]+", (v or "").lower()):
+            if len(t) >= 3 and t not in _PREF_STOPWORDS and t not in terms:
+                terms.append(t)
+    return terms
+
+
+def _is_search_listing(text: str) -> bool:
+    """Detect if text is a search result listing rather than a quote."""
+    if not text:
+        return True
+    t = text.lower()
+    # Skip if it looks like a numbered list of restaurants
+    if re.search(r"\d+\s*\.\s*[a-z]", t) and ("reviews" in t or "review" in t):
+        return True
+    # Skip if it contains multiple restaurant names with ratings
+    if t.count(".") > 3 and ("reviews" in t or "stars" in t or "rating" in t):
+        return True
+    # Skip aggregations like "Restaurants in X · 1. Name..."
+    if "·" in text and re.search(r"\d+\s*\.", text):
+        return True
+    # Skip if it's just a description without any actual opinion
+    if len(text) < 40:
+        return True
+    return False
+
+
+# Okapi BM25 parameters for ranking search results against preference terms.
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+
+
+def _rank_search_results(items: list[dict], terms: list[str]) -> list[dict]:
+    """Order results by BM25 relevance to `terms`, demoting directory listings.
+
+    Each result is tokenized once (title counted twice, so title hits weigh
+    more); a token matches a term it starts with, which covers simple plurals.
+    Ties keep search order.
+    """
+
+    docs: list[list[str]] = []
+    listing: list[bool] = []
+    for r in items:
+        title = _clean_snippet(str(r.get("title") or "")).lower()
+        content = _clean_snippet(str(r.get("content") or ""))
+        toks = re.findall(r"[a-z0-9]+", title)
+        docs.append(toks + toks + re.findall(r"[a-z0-9]+", content.lower()))
+        listing.append(_is_search_listing(content))
+
+    n = len(docs)
+    avgdl = (sum(len(d) for d in docs) / n) if n else 0.0
+    tf = [[sum(1 for tok in d if tok.startswith(t)) for t in terms] for d in docs]
+    df = [sum(1 for row in tf if row[j]) for j in range(len(terms))]
+    idf = [math.log(1 + (n - d + 0.5) / (d + 0.5)) for d in df]
+
+    scored: list[tuple[float, int]] = []
+    for i, d in enumerate(docs):
+        norm = _BM25_K1 * (1 - _BM25_B + _BM25_B * (len(d) / avgdl if avgdl else 0))
+        score = sum(
+            idf[j] * f * (_BM25_K1 + 1) / (f + norm) for j, f in enumerate(tf[i]) if f
+        )
+        if listing[i]:
+            # Lists of "Top 10 ..." rarely say anything quotable about one place.
+            score = score * 0.5 - 1.0
+        scored.append((score, i))
+    scored.sort(key=lambda p: (-p[0], p[1]))
+    return [items[i] for _, i in scored]
+
+
+def _partition_search_results(
+    ranked: list[dict], size: int = 6
+) -> tuple[list[dict], list[dict]]:
+    """Deal ranked results into two slices so both options get strong grounding.
+
+    Picks alternate A, B, B, A, ... (so neither slice gets all the best results),
+    and a result goes to the other slice if its site is already represented in
+    the intended one.
+    """
+
+    a: list[dict] = []
+    b: list[dict] = []
+    hosts: tuple[set, set] = (set(), set())
+    for i, r in enumerate(ranked):
+        if len(a) >= size and len(b) >= size:
+            break
+        host = urlparse(str(r.get("url") or "")).netloc.lower().removeprefix("www.")
+        want = 0 if i % 4 in (0, 3) else 1
+        slices = (a, b)
+        if len(slices[want]) >= size or (
+            host in hosts[want]
+            and host not in hosts[1 - want]
+            and len(slices[1 - want]) < size
+        ):
+            want = 1 - want
+        slices[want].append(r)
+        hosts[want].add(host)
+    return a, b
+
+
+def _search_context_line(r: dict, snippet_chars: int = 180) -> str:
+    title = (r.get("title") or "").strip()
+    url = (r.get("url") or "").strip()
+    snippet = (r.get("content") or "").strip().replace("\n", " ")
+    engine = (r.get("engine") or "").strip()
+    if snippet:
+        snippet = snippet[:snippet_chars]
+    return f"- {title} ({engine})\n  {url}\n  {snippet}"
+
+
+def _fit_search_context(items: list[dict], budget_tokens: int) -> tuple[str, int]:
+    """Format ranked results into a search context within a token budget.
+
+    `items` should already be in relevance order (see `_rank_search_results`);
+    snippets are shortened before a result is dropped. Returns (context, kept).
+    """
+
+    lines: list[str] = []
+    used = 0
+    for r in items:
+        line = _search_context_line(r)
+        cost = _estimate_tokens(line) + 1
+        if used + cost > budget_tokens:
+            avail = (budget_tokens - used - 1) * 4 - len(_search_context_line(r, 0))
+            if avail >= 60:
+                line = _search_context_line(r, min(180, avail))
+            elif not lines:
+                # Always ground the model in at least one result.
+                line = _search_context_line(r, 60)
+            else:
+                continue
+            cost = _estimate_tokens(line) + 1
+        lines.append(line)
+        used += cost
+    return "\n".join(lines), len(lines)
+
+
 def _extract_place_chatter(name: str, results: list[dict]) -> list[dict]:
     """Return a few verbatim snippet highlights for this place."""
 
@@ -1372,25 +4666,6 @@ def _extract_place_chatter(name: str, results: list[dict]) -> list[dict]:
             s -= 1
         return s
 
-    def _is_search_listing(text: str) -> bool:
-        """Detect if text is a search result listing rather than a quote."""
-        if not text:
-            return True
-        t = text.lower()
-        # Skip if it looks like a numbered list of restaurants
-        if re.search(r"\d+\s*\.\s*[a-z]", t) and ("reviews" in t or "review" in t):
-            return True
-        # Skip if it contains multiple restaurant names with ratings
-        if t.count(".") > 3 and ("reviews" in t or "stars" in t or "rating" in t):
-            return True
-        # Skip aggregations like "Restaurants in X · 1. Name..."
-        if "·" in text and re.search(r"\d+\s*\.", text):
-            return True
-        # Skip if it's just a description without any actual opinion
-        if len(text) < 40:
-            return True
-        return False
-
     candidates: list[dict] = []
     seen_urls: set[str] = set()
     for r in results[:24]:
@@ -1428,7 +4703,7 @@ def _extract_place_chatter(name: str, results: list[dict]) -> list[dict]:
 
 
 async def _search_restaurant_menu(
-    restaurant_name: str, location: str, client: httpx.AsyncClient
+    restaurant_name: str, location: str, client: Optional[httpx.AsyncClient] = None
 ) -> list[str]:
     """Find real menu items from restaurant's website and reviews."""
     if not restaurant_name or not location:
@@ -1615,6 +4890,165 @@ def _normalize_recommendations(items: list) -> list[dict]:
     return out
 
 
+# Admission control for the local LLM (Ollama): a bounded number of requests
+# generate at once, the rest wait in a bounded priority queue.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "2"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "16"))
+LLM_QUEUE_STATUS_INTERVAL_S = _env_float("LLM_QUEUE_STATUS_INTERVAL_S", 3.0)
+# Assumed slot hold time until real ones have been observed.
+LLM_QUEUE_DEFAULT_HOLD_S = _env_float("LLM_QUEUE_DEFAULT_HOLD_S", 20.0)
+
+
+class _LlmScheduler:
+    """Bounded LLM admission: priority classes, FIFO within a class.
+
+    A ticket holds `weight` slots (concurrent option generation needs two) from
+    grant until `release()`. Single-threaded asyncio, so no locking.
+    """
+
+    def __init__(self, capacity: int, max_queue: int) -> None:
+        self.capacity = max(1, capacity)
+        self.max_queue = max(0, max_queue)
+        self.in_use = 0
+        self._waiting: list[dict] = []
+        self._seq = 0
+        self._hold_s: "deque[float]" = deque(maxlen=50)
+        self.stats = {"admitted": 0, "everQueued": 0, "rejected": 0, "maxWaitS": 0.0}
+
+    def is_full(self) -> bool:
+        return self.in_use >= self.capacity and len(self._waiting) >= self.max_queue
+
+    def enqueue(self, *, priority: int, weight: int = 1) -> Optional[dict]:
+        """Return a ticket (granted or queued), or None if the queue is full."""
+
+        self._seq += 1
+        ticket = {
+            "priority": priority,
+            "seq": self._seq,
+            "weight": min(self.capacity, max(1, weight)),
+            "future": asyncio.get_running_loop().create_future(),
+            "queued_at": time.monotonic(),
+            "granted_at": None,
+            "released": False,
+        }
+        if not self._waiting and self.in_use + ticket["weight"] <= self.capacity:
+            self._grant(ticket)
+            return ticket
+        if len(self._waiting) >= self.max_queue:
+            self.stats["rejected"] += 1
+            return None
+
+        self.stats["everQueued"] += 1
+        self._waiting.append(ticket)
+        self._waiting.sort(key=lambda t: (t["priority"], t["seq"]))
+        return ticket
+
+    def try_acquire(self, *, weight: int = 1) -> Optional[dict]:
+        """Grant a ticket only if a slot is free now and nobody is waiting.
+
+        For optional work (e.g. LLM hedges) that must never queue.
+        """
+
+        if self._waiting or self.in_use + weight > self.capacity:
+            return None
+        return self.enqueue(priority=0, weight=weight)
+
+    def _grant(self, ticket: dict) -> None:
+        now = time.monotonic()
+        self.in_use += ticket["weight"]
+        ticket["granted_at"] = now
+        self.stats["admitted"] += 1
+        self.stats["maxWaitS"] = max(
+            self.stats["maxWaitS"], round(now - ticket["queued_at"], 2)
+        )
+        if not ticket["future"].done():
+            ticket["future"].set_result(True)
+
+    def position(self, ticket: dict) -> int:
+        """1-based queue position; 0 once granted."""
+
+        try:
+            return self._waiting.index(ticket) + 1
+        except ValueError:
+            return 0
+
+    def eta_s(self, ticket: Optional[dict] = None) -> float:
+        """Estimated wait before `ticket` (or a new arrival) gets a slot."""
+
+        hold = (
+            sum(self._hold_s) / len(self._hold_s)
+            if self._hold_s
+            else LLM_QUEUE_DEFAULT_HOLD_S
+        )
+        ahead = self._waiting
+        if ticket is not None:
+            pos = self.position(ticket)
+            if not pos:
+                return 0.0
+            ahead = self._waiting[: pos - 1]
+        busy = self.in_use + sum(t["weight"] for t in ahead)
+        return (
+            round(hold * math.ceil((busy + 1 - self.capacity) / self.capacity), 1)
+            if busy >= self.capacity
+            else 0.0
+        )
+
+    def release(self, ticket: Optional[dict]) -> None:
+        if ticket is None or ticket["released"]:
+            return
+        ticket["released"] = True
+        if ticket["granted_at"] is None:
+            # Gave up while queued (e.g. the client disconnected).
+            if ticket in self._waiting:
+                self._waiting.remove(ticket)
+            self._pump()
+            return
+
+        self.in_use -= ticket["weight"]
+        self._hold_s.append(time.monotonic() - ticket["granted_at"])
+        self._pump()
+
+    def _pump(self) -> None:
+        while (
+            self._waiting and self.in_use + self._waiting[0]["weight"] <= self.capacity
+        ):
+            self._grant(self._waiting.pop(0))
+
+    def info(self) -> dict:
+        return {
+            **self.stats,
+            "capacity": self.capacity,
+            "inUse": self.in_use,
+            "queued": len(self._waiting),
+            "maxQueue": self.max_queue,
+            "etaSeconds": self.eta_s(),
+        }
+
+
+_llm_scheduler = _LlmScheduler(LLM_MAX_CONCURRENCY, LLM_MAX_QUEUE)
+
+
+_RECOMMENDATION_INSTRUCTIONS = """You are FUD Buddy: witty, slightly sassy, extremely helpful.
+
+Task:
+Return exactly TWO restaurant recommendations based on the web snippets below.
+
+CRITICAL output requirements:
+- Each recommendation MUST be a JSON object.
+- Each object MUST have ONLY these top-level keys, in this order: restaurant, story, order, backupOrder, whatToWear.
+- restaurant MUST have keys: name, address, priceRange, rating.
+- whatToWear MUST be a short, vivid outfit description (1-2 sentences). Be specific and fun.
+- whatToWear should reference the vibe/venue and the food.
+- order and backupOrder: Use ONLY dishes mentioned in the search snippets. If no specific dishes are mentioned, set these to empty strings or describe the general cuisine type (e.g., "Italian pasta dishes"). NEVER fabricate specific menu items like "Classic pub burger" - that's misleading.
+- story MUST be a short string (2-3 sentences) grounded in the snippets.
+
+Rules:
+- Extract REAL information from the snippets only.
+- If you don't see a specific dish mentioned, don't make one up.
+- Keep story grounded in the snippets (no invented chefs/owners).
+- No markdown, no commentary, no extra keys."""
+
+
 @app.post("/api/chat/stream")
 async def chat_stream(request: Request, payload: ChatRequest):
     prefs = payload.preferences or {}
@@ -1623,6 +5057,24 @@ async def chat_stream(request: Request, payload: ChatRequest):
     cuisine = ", ".join(prefs.get("cuisine", [])) or "any"
     dietary = ", ".join(prefs.get("dietary", [])) or "none"
 
+    # Route once, up front: a request failed over to the local model (OpenRouter
+    # breaker open) is admission-controlled like any other local request, and the
+    # meta event reports where it actually goes. Whitelisted clients jump the queue.
+    openrouter_key, openrouter_model = _resolve_openrouter_overrides(request)
+    openrouter_key = _llm_route(openrouter_key, openrouter_model)
+    uses_local_llm = not openrouter_key
+    client_id = _get_client_id(request)
+    llm_priority = (
+        0 if client_id and client_id in RATE_LIMIT_WHITELIST_CLIENT_IDS else 1
+    )
+    if uses_local_llm and _llm_scheduler.is_full():
+        retry_after = max(1, math.ceil(_llm_scheduler.eta_s()))
+        raise HTTPException(
+            status_code=503,
+            detail="The kitchen is slammed right now. Please try again shortly.",
+            headers={"Retry-After": str(retry_after)},
+        )
+
     async def event_generator():
         limited = _check_rate_limit(request)
         if limited:
@@ -1631,21 +5083,14 @@ async def chat_stream(request: Request, payload: ChatRequest):
             return
 
         # Emit model info so the client can display it.
-        openrouter_key, openrouter_model = _resolve_openrouter_overrides(request)
-        if openrouter_key:
-            yield _sse(
-                {
-                    "type": "meta",
-                    "llm": {
-                        "provider": "openrouter",
-                        "model": openrouter_model or OPENROUTER_MODEL,
-                    },
-                }
-            )
-        else:
-            yield _sse(
-                {"type": "meta", "llm": {"provider": "ollama", "model": OLLAMA_MODEL}}
-            )
+        provider, model = _llm_target(openrouter_key, openrouter_model)
+        yield _sse(
+            {
+                "type": "meta",
+                "llm": {"provider": provider, "model": model},
+                "generation": OPTION_GENERATION_MODE,
+            }
+        )
 
         # Status updates
         display_location = (
@@ -1667,43 +5112,8 @@ async def chat_stream(request: Request, payload: ChatRequest):
 
         def _is_dense_urban(loc: str) -> bool:
             """Detect if location is a dense urban area (postal code or big city)."""
-            l = (loc or "").lower()
-            # Canadian postal codes (M5V, V6B, etc.)
-            if re.search(r"\b[a-z]\d[a-z]", l):
-                return True
-            # Major cities
-            urban_keywords = [
-                "toronto",
-                "vancouver",
-                "montreal",
-                "calgary",
-                "ottawa",
-                "edmonton",
-                "quebec",
-                "winnipeg",
-                "hamilton",
-                "kitchener",
-                "london",
-                "victoria",
-                "halifax",
-                "oshawa",
-                "windsor",
-                "saskatoon",
-                "regina",
-                "kelowna",
-                "barrie",
-                "guelph",
-                "downtown",
-                "midtown",
-                "chinatown",
-                "yaletown",
-                "kensington",
-                "annex",
-                "beaches",
-                "distillery",
-                "liberty village",
-            ]
-            return any(kw in l for kw in urban_keywords)
+            place = _gazetteer.lookup(loc)
+            return place is not None and place["density"] == "urban"
 
         def _travel_attempts_km(p: dict, loc: str) -> list[float]:
             # Walking speed: ~5km/h = 0.08 km/min
@@ -1764,7 +5174,12 @@ async def chat_stream(request: Request, payload: ChatRequest):
         if origin is None:
             origin = _parse_coords(str(location))
         if origin is None and str(location).strip() and str(location) != "near you":
-            origin = await _forward_geocode(str(location))
+            # Common places resolve offline; everything else goes to Nominatim.
+            place = _gazetteer.lookup(str(location))
+            if place is not None:
+                origin = place["coords"]
+        if origin is None and str(location).strip() and str(location) != "near you":
+            origin = await _forward_geocode(str(location), priority=_GEO_PRIORITY_USER)
 
         location_hint = ""
         if str(location).strip() and str(location) != "near you":
@@ -1783,6 +5198,11 @@ async def chat_stream(request: Request, payload: ChatRequest):
             name = str(restaurant.get("name") or "").strip()
             addr = str(restaurant.get("address") or "").strip()
 
+            # Picks from the verified candidate pool already have a distance.
+            known_km = verified_km.get(_PlaceIndex.key(name, ""))
+            if known_km is not None:
+                return known_km > max_km
+
             # Fast string guard for common "big city" drift.
             try:
                 loc_l = str(location).lower()
@@ -1805,9 +5225,20 @@ async def chat_stream(request: Request, payload: ChatRequest):
             q = (name + " " + addr).strip()
             if not q:
                 return False
-            coords = await _forward_geocode(q)
+            coords = _place_index.get(name, addr) if addr else None
             if coords is None:
-                return False
+                # Candidate-pool entries are indexed under the request location, not
+                # the model's address: a same-named place in range settles it.
+                named = _place_index.nearest_named(name, origin)
+                if named is not None and named[1] <= max_km:
+                    _place_index.stats["nameHits"] += 1
+                    return False
+                coords = await _forward_geocode(q)
+                if coords is None:
+                    return False
+                # Name alone is too ambiguous (chains) to index.
+                if addr:
+                    await _place_index_add(name, addr, coords)
             try:
                 return _haversine_km(origin, coords) > max_km
             except Exception:
@@ -1821,26 +5252,23 @@ async def chat_stream(request: Request, payload: ChatRequest):
         )
 
         # Build search queries (keep these tight; we just need candidates and context)
-        # Minimize queries for responsiveness.
-        base_query = (
-            f"restaurants in {location}"
-            if cuisine == "any"
-            else f"{cuisine} restaurants in {location}"
-        )
-        searches = [
-            f"best {vibe.replace('-', ' ')} {base_query}",
-            f"top rated {base_query}",
-        ]
+        searches, extra_searches = _plan_searches(vibe, cuisine, location)
 
         session_id = uuid.uuid4()
 
-        # Search (parallel + shared client)
+        # Search in one parallel wave. Supplementary queries start speculatively
+        # alongside the primary ones and are only awaited if Option B comes up short.
+        extra_tasks = (
+            [
+                asyncio.create_task(search_web(q, location=location))
+                for q in extra_searches
+            ]
+            if SEARCH_SPECULATIVE
+            else []
+        )
         found: list[dict] = []
-        async with httpx.AsyncClient(
-            timeout=12.0, follow_redirects=True
-        ) as search_client:
-            tasks = [search_web(q, client=search_client) for q in searches]
-            results_lists = await asyncio.gather(*tasks, return_exceptions=True)
+        tasks = [search_web(q, location=location) for q in searches]
+        results_lists = await asyncio.gather(*tasks, return_exceptions=True)
 
         for results in results_lists:
             if isinstance(results, BaseException):
@@ -1862,6 +5290,8 @@ async def chat_stream(request: Request, payload: ChatRequest):
             dedup.append(r)
 
         if len(dedup) == 0:
+            for t in extra_tasks:
+                t.cancel()
             yield _sse(
                 {
                     "type": "error",
@@ -1872,6 +5302,14 @@ async def chat_stream(request: Request, payload: ChatRequest):
             yield _sse({"type": "done"})
             return
 
+        # Locate the restaurants the results mention while Option B's sources are
+        # topped up; the model then only sees candidates verified to be in range.
+        candidates_task: Optional[asyncio.Task] = None
+        if CANDIDATE_POOL and origin is not None:
+            candidates_task = asyncio.create_task(
+                _verified_candidates(dedup, str(location), origin, base_travel_km)
+            )
+
         def _make_sources(items: list[dict]) -> list[dict]:
             return [
                 {
@@ -1883,88 +5321,114 @@ async def chat_stream(request: Request, payload: ChatRequest):
                 if (r.get("url") or "").strip()
             ]
 
-        def _make_search_context(items: list[dict]) -> str:
-            lines: list[str] = []
-            for r in items:
-                title = (r.get("title") or "").strip()
-                url = (r.get("url") or "").strip()
-                snippet = (r.get("content") or "").strip().replace("\n", " ")
-                engine = (r.get("engine") or "").strip()
-                if snippet:
-                    snippet = snippet[:180]
-                lines.append(f"- {title} ({engine})\n  {url}\n  {snippet}")
-            return "\n".join(lines)
-
-        # Split sources so Option B is grounded in a different set.
-        dedup_a = dedup[:6]
-        dedup_b = dedup[6:12]
+        # Rank by relevance to the user's preferences, then split so Option B is
+        # grounded in a different (but equally strong) set.
+        pref_terms = _preference_terms(vibe, cuisine, dietary)
+        dedup_a, dedup_b = _partition_search_results(
+            _rank_search_results(dedup, pref_terms)
+        )
         if len(dedup_b) < 4:
-            try:
-                async with httpx.AsyncClient(
-                    timeout=12.0, follow_redirects=True
-                ) as search_client:
-                    more = await search_web(
-                        f"best {vibe} restaurants {location} hidden gem",
-                        client=search_client,
-                    )
+            if extra_tasks:
+                extra_lists = await asyncio.gather(*extra_tasks, return_exceptions=True)
+            else:
+                extra_lists = await asyncio.gather(
+                    *[search_web(q, location=location) for q in extra_searches],
+                    return_exceptions=True,
+                )
+            extra: list[dict] = []
+            for more in extra_lists:
+                if not isinstance(more, list):
+                    continue
                 for r in more:
                     url = (r.get("url") or "").strip()
                     if not url or url in seen:
                         continue
                     seen.add(url)
-                    dedup_b.append(r)
-                    if len(dedup_b) >= 6:
-                        break
-            except Exception:
-                pass
+                    extra.append(r)
+            dedup_b = _rank_search_results(dedup_b + extra, pref_terms)[:6]
+        else:
+            # Not needed; the shared fetch still finishes and warms the search cache.
+            for t in extra_tasks:
+                t.cancel()
 
         sources_a = _make_sources(dedup_a)
         sources_b = _make_sources(dedup_b)
         urls_a = {s.get("url") for s in sources_a}
         sources = sources_a + [s for s in sources_b if s.get("url") not in urls_a]
 
-        search_context_a = _make_search_context(dedup_a)
-        search_context_b = _make_search_context(dedup_b if dedup_b else dedup_a)
-
-        yield _sse(
-            {"type": "status", "content": "Found some chatter. Cooking up two picks..."}
-        )
+        candidates: list[dict] = []
+        if candidates_task is not None:
+            if not candidates_task.done():
+                yield _sse(
+                    {"type": "status", "content": "Checking what's actually nearby..."}
+                )
+            try:
+                candidates = await candidates_task
+            except Exception:
+                candidates = []
+        verified_km = {
+            _PlaceIndex.key(c["name"], ""): c["distanceKm"] for c in candidates
+        }
+        candidates_context = ""
+        if candidates:
+            candidates_context = (
+                f"\nVerified nearby restaurants (all within {base_travel_km:.1f} km of "
+                f"{location}); pick from these when one fits:\n"
+                + "\n".join(
+                    f"- {c['name']} (~{c['distanceKm']:.1f} km)" for c in candidates
+                )
+                + "\n"
+            )
 
         # Use LLM to generate recommendations.
         # IMPORTANT: We do not fabricate private identity info; story focuses on the venue.
         def _build_context(search_context: str) -> str:
-            return f"""You are FUD Buddy: witty, slightly sassy, extremely helpful.
+            # Static instructions first, then this request's context, then the
+            # slice-specific snippets: Option A/B prompts (and repeat requests) share
+            # the longest possible prefix, which Ollama serves from its prompt cache.
+            return f"""{_RECOMMENDATION_INSTRUCTIONS}
 
 User context:
 - Location: {location}
 - Vibe: {vibe}
 - Cuisine: {cuisine}
 - Dietary: {dietary}
-
+{candidates_context}
 
 Web search results (snippets + URLs):
-{search_context}
-
-Task:
-Return exactly TWO restaurant recommendations based on the web snippets.
-
-CRITICAL output requirements:
-- Each recommendation MUST be a JSON object.
-- Each object MUST have ONLY these top-level keys: restaurant, whatToWear, order, backupOrder, story.
-- restaurant MUST have keys: name, address, priceRange, rating.
-- whatToWear MUST be a short, vivid outfit description (1-2 sentences). Be specific and fun.
-- whatToWear should reference the vibe/venue and the food.
-- order and backupOrder: Use ONLY dishes mentioned in the search snippets. If no specific dishes are mentioned, set these to empty strings or describe the general cuisine type (e.g., "Italian pasta dishes"). NEVER fabricate specific menu items like "Classic pub burger" - that's misleading.
-- story MUST be a short string (2-3 sentences) grounded in the snippets.
+{search_context}"""
+
+        # Fit each slice's snippets into the model's prompt budget. In single mode
+        # both slices share one prompt, so each gets half.
+        budget = _prompt_token_budget(provider, model)
+        slice_budget = max(120, budget - _estimate_tokens(_build_context("")) - 120)
+        if OPTION_GENERATION_MODE == "single":
+            slice_budget //= 2
+        search_context_a, kept_a = _fit_search_context(dedup_a, slice_budget)
+        search_context_b, kept_b = _fit_search_context(
+            dedup_b if dedup_b else dedup_a, slice_budget
+        )
 
-Rules:
-- Extract REAL information from the snippets only.
-- If you don't see a specific dish mentioned, don't make one up.
-- Keep story grounded in the snippets (no invented chefs/owners).
-- No markdown, no commentary, no extra keys."""
+        yield _sse(
+            {"type": "status", "content": "Found some chatter. Cooking up two picks..."}
+        )
 
         context_a = _build_context(search_context_a)
         context_b = _build_context(search_context_b)
+        yield _sse(
+            {
+                "type": "meta",
+                "prompt": {
+                    "budgetTokens": budget,
+                    "tokens": [
+                        _estimate_tokens(context_a),
+                        _estimate_tokens(context_b),
+                    ],
+                    "snippets": [kept_a, kept_b],
+                },
+                "candidates": [c["name"] for c in candidates],
+            }
+        )
 
         ground_a = dedup_a
         ground_b = dedup_b if dedup_b else dedup_a
@@ -1972,7 +5436,41 @@ Rules:
         img_sources_a = sources_a if sources_a else sources
         img_sources_b = sources_b if sources_b else sources
 
+        llm_ticket: Optional[dict] = None
+        if uses_local_llm:
+            llm_ticket = _llm_scheduler.enqueue(
+                priority=llm_priority,
+                weight=2 if OPTION_GENERATION_MODE == "concurrent" else 1,
+            )
+            if llm_ticket is None:
+                yield _sse(
+                    {
+                        "type": "error",
+                        "message": "The kitchen is slammed right now. Please try again shortly.",
+                        "retryAfterSeconds": max(1, math.ceil(_llm_scheduler.eta_s())),
+                    }
+                )
+                yield _sse({"type": "done"})
+                return
+
         try:
+            while llm_ticket is not None and not llm_ticket["future"].done():
+                pos = _llm_scheduler.position(llm_ticket)
+                eta = _llm_scheduler.eta_s(llm_ticket)
+                yield _sse(
+                    {
+                        "type": "status",
+                        "content": f"Lots of hungry people right now. You're #{pos} in line (~{math.ceil(eta)}s)...",
+                        "queue": {"position": pos, "etaSeconds": eta},
+                    }
+                )
+                try:
+                    await asyncio.wait_for(
+                        asyncio.shield(llm_ticket["future"]),
+                        timeout=LLM_QUEUE_STATUS_INTERVAL_S,
+                    )
+                except asyncio.TimeoutError:
+                    pass
 
             def _option_prompt(
                 ctx: str, label: str, guidance: str, *, exclude_name: str = ""
@@ -1989,8 +5487,6 @@ Rules:
                     + "Return ONLY a single JSON object. No surrounding array. No markdown."
                 )
 
-            effective_travel_km = base_travel_km
-
             def _guidance(
                 base: str, *, km: float, allow_fallback_vibe: bool = False
             ) -> str:
@@ -2002,436 +5498,490 @@ Rules:
                     [p for p in (base.strip(), th.strip(), fb.strip()) if p]
                 )
 
-            prompt_b = ""
             name_a = ""
 
-            recs: list[dict] = []
+            def _finish_option(obj: Any, text: str) -> tuple[Optional[dict], str, str]:
+                if not isinstance(obj, dict):
+                    return None, text, "invalid JSON"
 
-            attempts_a = travel_attempts_km or [effective_travel_km]
-            yield _sse({"type": "status", "content": "Writing option A..."})
+                norm = _normalize_recommendations([obj])
+                if not norm:
+                    return None, text, "unusable structure"
 
-            rec_a: dict = {}
-            rest_a: Any = {}
-            for i, km in enumerate(attempts_a):
-                if i > 0:
-                    yield _sse(
-                        {
-                            "type": "status",
-                            "content": "Still scanning nearby...",
-                        }
+                rec = norm[0]
+                rest = rec.get("restaurant") or {}
+                if isinstance(rest, dict):
+                    rec["maps"] = _maps_links(
+                        str(rest.get("name") or ""),
+                        str(rest.get("address") or ""),
                     )
+                return rec, text, ""
 
-                prompt_a = _option_prompt(
-                    context_a,
-                    "Option A",
-                    _guidance(
-                        "Pick the cheaper/casual choice.",
-                        km=km,
-                        allow_fallback_vibe=(i == len(attempts_a) - 1),
-                    ),
-                )
-                text_a = await _llm_generate(
-                    prompt_a,
+            async def _generate_option(
+                prompt: str,
+            ) -> tuple[Optional[dict], str, str]:
+                """Run one option prompt; returns (recommendation, raw text, error)."""
+
+                text = await _llm_generate(
+                    prompt,
                     openrouter_key=openrouter_key,
                     openrouter_model=openrouter_model,
                 )
-                obj_a = _extract_json_value(text_a)
-                if not isinstance(obj_a, dict):
-                    yield _sse(
-                        {
-                            "type": "error",
-                            "message": "Model returned invalid JSON for option A.",
-                            "rawPreview": str(text_a)[:500],
-                        }
-                    )
-                    yield _sse({"type": "done"})
-                    return
-
-                norm_a = _normalize_recommendations([obj_a])
-                if not norm_a:
-                    yield _sse(
-                        {
-                            "type": "error",
-                            "message": "Model returned unusable structure for option A.",
-                            "rawPreview": str(text_a)[:500],
-                        }
-                    )
-                    yield _sse({"type": "done"})
-                    return
-
-                rec_a = norm_a[0]
-                rest_a = rec_a.get("restaurant") or {}
-                if isinstance(rest_a, dict):
-                    rec_a["maps"] = _maps_links(
-                        str(rest_a.get("name") or ""),
-                        str(rest_a.get("address") or ""),
-                    )
-
-                try:
-                    if not await _is_too_far(rest_a, max_km=km):
-                        effective_travel_km = km
-                        break
-                except Exception:
-                    effective_travel_km = km
-                    break
-
-            if isinstance(rest_a, dict):
-                name_a = str(rest_a.get("name") or "").strip()
-            prompt_b = _option_prompt(
-                context_b,
-                "Option B",
-                _guidance(
-                    "Pick a pricier/special choice.",
-                    km=effective_travel_km,
-                    allow_fallback_vibe=True,
-                ),
-                exclude_name=name_a,
-            )
+                return _finish_option(_extract_json_value(text), text)
+
+            # Fields worth a partial `option` event while the object is still streaming.
+            partial_fields = {
+                ("restaurant", "name"),
+                ("restaurant",),
+                ("story",),
+                ("order",),
+            }
 
-            # Ensure whatToWear isn't bland; replace with a fun generated line.
-            try:
-                o = rec_a.get("order")
-                main = str(o.get("main") or "") if isinstance(o, dict) else ""
-                place = (
-                    str(rest_a.get("name") or "") if isinstance(rest_a, dict) else ""
-                )
-                wt = str(rec_a.get("whatToWear") or "")
-                if len(wt.strip()) < 18 or "casual" in wt.lower():
-                    rec_a["whatToWear"] = _generate_outfit(vibe, place, main)
-            except Exception:
-                pass
-            recs.append(rec_a)
-            yield _sse({"type": "option", "index": 0, "recommendation": rec_a})
+            async def _option_updates(prompt: str):
+                """Yield ("partial", rec) as fields stream in, then ("final", result).
 
-            # Attach verbatim snippet highlights + signals for UI grounding.
-            try:
-                place = (
-                    str(rest_a.get("name") or "") if isinstance(rest_a, dict) else ""
-                )
-                chatter = _extract_place_chatter(place, ground_a)
-                signals = _extract_signals(chatter + ground_a, place)
-                if chatter:
-                    rec_a["peopleSay"] = chatter
-                if signals:
-                    rec_a["signals"] = signals
-            except Exception:
-                pass
+                `result` has the same shape as `_generate_option`'s return value.
+                """
 
-            attempts_b = [effective_travel_km] + [
-                km for km in (travel_attempts_km or []) if km > effective_travel_km
-            ]
-            if not attempts_b:
-                attempts_b = [effective_travel_km]
-
-            yield _sse({"type": "status", "content": "Writing option B..."})
-            rec_b: dict = {}
-            rest_b: Any = {}
-            for i, km in enumerate(attempts_b):
-                if i > 0:
-                    yield _sse(
-                        {
-                            "type": "status",
-                            "content": "Scanning a little wider in your area...",
-                        }
-                    )
+                if not LLM_STREAM_OPTIONS:
+                    yield "final", await _generate_option(prompt)
+                    return
 
-                prompt_b = _option_prompt(
-                    context_b,
-                    "Option B",
-                    _guidance(
-                        "Pick a pricier/special choice.",
-                        km=km,
-                        allow_fallback_vibe=(i == len(attempts_b) - 1),
-                    ),
-                    exclude_name=name_a,
-                )
-                text_b = await _llm_generate(
-                    prompt_b,
+                scanner = _JsonObjectScanner()
+                partial: dict = {}
+                async for path, value in _llm_stream_object(
+                    prompt,
+                    scanner,
                     openrouter_key=openrouter_key,
                     openrouter_model=openrouter_model,
-                )
-                obj_b = _extract_json_value(text_b)
-                if not isinstance(obj_b, dict):
-                    yield _sse(
-                        {
-                            "type": "error",
-                            "message": "Model returned invalid JSON for option B.",
-                            "rawPreview": str(text_b)[:500],
-                        }
-                    )
-                    yield _sse({"type": "done"})
-                    return
+                ):
+                    if path not in partial_fields:
+                        continue
+                    node = partial
+                    for k in path[:-1]:
+                        if not isinstance(node.get(k), dict):
+                            node[k] = {}
+                        node = node[k]
+                    node[path[-1]] = value
+
+                    norm = _normalize_recommendations([partial])
+                    if norm and norm[0]["restaurant"].get("name"):
+                        yield "partial", norm[0]
+
+                text = scanner.text or scanner.buf
+                obj = scanner.value if scanner.done else _extract_json_value(text)
+                yield "final", _finish_option(obj, text)
+
+            def _option_error(label: str, err: str, text: str) -> dict:
+                return {
+                    "type": "error",
+                    "message": f"Model returned {err} for option {label}.",
+                    "rawPreview": str(text)[:500],
+                }
 
-                norm_b = _normalize_recommendations([obj_b])
-                if not norm_b:
-                    yield _sse(
-                        {
-                            "type": "error",
-                            "message": "Model returned unusable structure for option B.",
-                            "rawPreview": str(text_b)[:500],
-                        }
+            def _polish_outfit(rec: dict) -> None:
+                # Ensure whatToWear isn't bland; replace with a fun generated line.
+                try:
+                    rest = rec.get("restaurant") or {}
+                    o = rec.get("order")
+                    main = str(o.get("main") or "") if isinstance(o, dict) else ""
+                    place = (
+                        str(rest.get("name") or "") if isinstance(rest, dict) else ""
                     )
-                    yield _sse({"type": "done"})
-                    return
+                    wt = str(rec.get("whatToWear") or "")
+                    if len(wt.strip()) < 18 or "casual" in wt.lower():
+                        rec["whatToWear"] = _generate_outfit(vibe, place, main)
+                except Exception:
+                    pass
 
-                rec_b = norm_b[0]
-                rest_b = rec_b.get("restaurant") or {}
-                if isinstance(rest_b, dict):
-                    rec_b["maps"] = _maps_links(
-                        str(rest_b.get("name") or ""),
-                        str(rest_b.get("address") or ""),
-                    )
+            async def _resolve_option(
+                state: dict,
+                *,
+                index: int,
+                label: str,
+                guidance: str,
+                ctx: str,
+                attempts: list[float],
+                widen_status: str,
+                exclude_name: str = "",
+                seed: Optional[dict] = None,
+                seed_too_far: Optional[bool] = None,
+            ):
+                """Settle one option, widening the radius when the pick is too far.
+
+                Yields SSE events as it goes. The final pick lands in `state`
+                (`rec`, `km`); `state["failed"]` is set if the model output was unusable.
+                A `seed` (already generated at attempts[0]) skips the first LLM call.
+                """
 
-                # Ensure distinct restaurants; retry once if duplicated (at this radius).
-                try:
-                    if isinstance(rest_b, dict) and name_a:
-                        name_b = str(rest_b.get("name") or "").strip()
-                        if name_b and name_b.lower() == name_a.lower():
+                async def _attempt(prompt: str):
+                    async for kind, payload in _option_updates(prompt):
+                        if kind == "partial":
                             yield _sse(
                                 {
-                                    "type": "status",
-                                    "content": "Option B looked too similar. Retrying...",
+                                    "type": "option",
+                                    "index": index,
+                                    "recommendation": payload,
+                                    "partial": True,
                                 }
                             )
-                            prompt_b2 = _option_prompt(
-                                context_b,
-                                "Option B",
+                        else:
+                            state["last"] = payload
+
+                for i, km in enumerate(attempts):
+                    if i > 0:
+                        yield _sse({"type": "status", "content": widen_status})
+
+                    known_too_far: Optional[bool] = None
+                    if i == 0 and seed is not None:
+                        rec = seed
+                        known_too_far = seed_too_far
+                    else:
+                        async for ev in _attempt(
+                            _option_prompt(
+                                ctx,
+                                f"Option {label}",
                                 _guidance(
-                                    "Pick a pricier/special choice that is NOT the same restaurant as Option A.",
+                                    guidance,
                                     km=km,
-                                    allow_fallback_vibe=True,
+                                    allow_fallback_vibe=(i == len(attempts) - 1),
                                 ),
-                                exclude_name=name_a,
+                                exclude_name=exclude_name,
                             )
-                            text_b2 = await _llm_generate(
-                                prompt_b2,
-                                openrouter_key=openrouter_key,
-                                openrouter_model=openrouter_model,
+                        ):
+                            yield ev
+                        rec, text, err = state.pop("last")
+                        if rec is None:
+                            state["failed"] = True
+                            yield _sse(_option_error(label, err, text))
+                            return
+
+                    # Ensure distinct restaurants; retry once if duplicated (at this radius).
+                    try:
+                        rest = rec.get("restaurant") or {}
+                        name = (
+                            str(rest.get("name") or "").strip()
+                            if isinstance(rest, dict)
+                            else ""
+                        )
+                        if (
+                            exclude_name
+                            and name
+                            and name.lower() == exclude_name.lower()
+                        ):
+                            yield _sse(
+                                {
+                                    "type": "status",
+                                    "content": f"Option {label} looked too similar. Retrying...",
+                                }
                             )
-                            obj_b2 = _extract_json_value(text_b2)
-                            norm_b2 = _normalize_recommendations(
-                                [obj_b2] if isinstance(obj_b2, dict) else []
+                            async for ev in _attempt(
+                                _option_prompt(
+                                    ctx,
+                                    f"Option {label}",
+                                    _guidance(
+                                        guidance.rstrip(".")
+                                        + " that is NOT the same restaurant as Option A.",
+                                        km=km,
+                                        allow_fallback_vibe=True,
+                                    ),
+                                    exclude_name=exclude_name,
+                                )
+                            ):
+                                yield ev
+                            rec2, _, _ = state.pop("last")
+                            if rec2 is not None:
+                                rec = rec2
+                                known_too_far = None
+                    except Exception:
+                        pass
+
+                    state["rec"] = rec
+                    state["km"] = km
+                    try:
+                        if known_too_far is None:
+                            known_too_far = await _is_too_far(
+                                rec.get("restaurant") or {}, max_km=km
                             )
-                            if norm_b2:
-                                rec_b = norm_b2[0]
-                                rest_b = rec_b.get("restaurant") or {}
-                                if isinstance(rest_b, dict):
-                                    rec_b["maps"] = _maps_links(
-                                        str(rest_b.get("name") or ""),
-                                        str(rest_b.get("address") or ""),
-                                    )
-                except Exception:
-                    pass
-
-                try:
-                    if not await _is_too_far(rest_b, max_km=km):
-                        effective_travel_km = km
+                        if not known_too_far:
+                            break
+                    except Exception:
                         break
-                except Exception:
-                    effective_travel_km = km
-                    break
-
-            try:
-                o = rec_b.get("order")
-                main = str(o.get("main") or "") if isinstance(o, dict) else ""
-                place = (
-                    str(rest_b.get("name") or "") if isinstance(rest_b, dict) else ""
-                )
-                wt = str(rec_b.get("whatToWear") or "")
-                if len(wt.strip()) < 18 or "casual" in wt.lower():
-                    rec_b["whatToWear"] = _generate_outfit(vibe, place, main)
-            except Exception:
-                pass
-
-            recs.append(rec_b)
-            yield _sse({"type": "option", "index": 1, "recommendation": rec_b})
-
-            # Search for actual menu items and photos for both restaurants
-            dishes_a: list[str] = []
-            dishes_b: list[str] = []
-            place_a_data: Optional[dict] = None
-            place_b_data: Optional[dict] = None
 
-            try:
-                yield _sse(
-                    {
-                        "type": "status",
-                        "content": "Looking up real menu items and photos...",
-                    }
-                )
-                async with httpx.AsyncClient(
-                    timeout=10.0, follow_redirects=True
-                ) as menu_client:
-                    # Try Google Places first (if available)
-                    if GOOGLE_PLACES_API_KEY:
-                        if isinstance(rest_a, dict):
-                            name_a_menu = str(rest_a.get("name") or "")
-                            if name_a_menu:
-                                place_a_data = await _get_place_from_google(
-                                    name_a_menu, location, menu_client
-                                )
-                                if place_a_data:
-                                    # Use Google Places photo
-                                    if place_a_data.get("photo_url"):
-                                        rec_a["imageUrl"] = place_a_data["photo_url"]
-                                    # Use menu items from reviews
-                                    if (
-                                        place_a_data.get("menu_items")
-                                        and len(place_a_data["menu_items"]) >= 2
-                                    ):
-                                        dishes_a = place_a_data["menu_items"]
-                                        rec_a["order"] = {
-                                            "main": dishes_a[0],
-                                            "side": dishes_a[1]
-                                            if len(dishes_a) > 1
-                                            else "",
-                                            "drink": "",
-                                        }
-                                        if len(dishes_a) >= 3:
-                                            rec_a["backupOrder"] = {
-                                                "main": dishes_a[2],
-                                                "side": dishes_a[3]
-                                                if len(dishes_a) > 3
-                                                else "",
-                                                "drink": "",
-                                            }
-                                    # Update price/rating if available
-                                    if place_a_data.get("price_level") and isinstance(
-                                        rest_a, dict
-                                    ):
-                                        price_map = {
-                                            1: "$",
-                                            2: "$$",
-                                            3: "$$$",
-                                            4: "$$$$",
-                                        }
-                                        rest_a["priceRange"] = price_map.get(
-                                            place_a_data["price_level"],
-                                            rest_a.get("priceRange", ""),
-                                        )
-                                    if place_a_data.get("address") and isinstance(
-                                        rest_a, dict
-                                    ):
-                                        rest_a["address"] = place_a_data["address"]
-
-                        if isinstance(rest_b, dict):
-                            name_b_menu = str(rest_b.get("name") or "")
-                            if name_b_menu:
-                                place_b_data = await _get_place_from_google(
-                                    name_b_menu, location, menu_client
+            recs: list[dict] = []
+            state_a: dict = {}
+            state_b: dict = {}
+            guidance_a = "Pick the cheaper/casual choice."
+            guidance_b = "Pick a pricier/special choice."
+            attempts_a = travel_attempts_km or [base_travel_km]
+
+            if OPTION_GENERATION_MODE in ("concurrent", "single"):
+                # Both options start at the base radius on their own slices. Each
+                # `option` event goes out as soon as it is ready, except that nothing
+                # for B is sent before A has shown up: the UI slots options
+                # positionally, so B must never land in A's slot.
+                yield _sse({"type": "status", "content": "Writing both options..."})
+                km0 = attempts_a[0]
+                fallback0 = len(attempts_a) == 1
+                labels = {0: "A", 1: "B"}
+                seeds: dict[int, dict] = {}
+
+                if OPTION_GENERATION_MODE == "single":
+                    # One completion covering both source slices; objects are popped
+                    # off the stream as they close.
+                    pair_prompt = (
+                        _build_context(
+                            "Option A results:\n"
+                            + search_context_a
+                            + "\n\nOption B results:\n"
+                            + search_context_b
+                        )
+                        + "\n\n"
+                        + "Now produce Option A, then Option B.\n"
+                        + "Option A: "
+                        + _guidance(
+                            guidance_a + " Use the Option A results.",
+                            km=km0,
+                            allow_fallback_vibe=fallback0,
+                        )
+                        + "\n"
+                        + "Option B: "
+                        + _guidance(
+                            guidance_b
+                            + " Use the Option B results. MUST be a different restaurant than Option A.",
+                            km=km0,
+                            allow_fallback_vibe=fallback0,
+                        )
+                        + "\n"
+                        + "Return ONLY the two JSON objects, Option A first, one after the other. No surrounding array. No markdown."
+                    )
+                    objects = _llm_stream_objects(
+                        pair_prompt,
+                        2,
+                        openrouter_key=openrouter_key,
+                        openrouter_model=openrouter_model,
+                    )
+                    try:
+                        async for obj_text in objects:
+                            idx = len(seeds)
+                            try:
+                                obj = json.loads(obj_text)
+                            except Exception:
+                                obj = None
+                            rec, text, err = _finish_option(obj, obj_text)
+                            if rec is None:
+                                if idx == 0:
+                                    yield _sse(_option_error("A", err, text))
+                                    yield _sse({"type": "done"})
+                                    return
+                                # B gets regenerated on its own below.
+                                break
+                            _polish_outfit(rec)
+                            seeds[idx] = rec
+                            yield _sse(
+                                {"type": "option", "index": idx, "recommendation": rec}
+                            )
+                    finally:
+                        await objects.aclose()
+
+                    if 0 not in seeds:
+                        yield _sse(_option_error("A", "invalid JSON", ""))
+                        yield _sse({"type": "done"})
+                        return
+                else:
+                    merged = _merge_async_iters(
+                        {
+                            idx: _option_updates(
+                                _option_prompt(
+                                    ctx,
+                                    f"Option {labels[idx]}",
+                                    _guidance(g, km=km0, allow_fallback_vibe=fallback0),
                                 )
-                                if place_b_data:
-                                    if place_b_data.get("photo_url"):
-                                        rec_b["imageUrl"] = place_b_data["photo_url"]
-                                    if (
-                                        place_b_data.get("menu_items")
-                                        and len(place_b_data["menu_items"]) >= 2
-                                    ):
-                                        dishes_b = place_b_data["menu_items"]
-                                        rec_b["order"] = {
-                                            "main": dishes_b[0],
-                                            "side": dishes_b[1]
-                                            if len(dishes_b) > 1
-                                            else "",
-                                            "drink": "",
-                                        }
-                                        if len(dishes_b) >= 3:
-                                            rec_b["backupOrder"] = {
-                                                "main": dishes_b[2],
-                                                "side": dishes_b[3]
-                                                if len(dishes_b) > 3
-                                                else "",
-                                                "drink": "",
-                                            }
-                                    if place_b_data.get("price_level") and isinstance(
-                                        rest_b, dict
-                                    ):
-                                        price_map = {
-                                            1: "$",
-                                            2: "$$",
-                                            3: "$$$",
-                                            4: "$$$$",
-                                        }
-                                        rest_b["priceRange"] = price_map.get(
-                                            place_b_data["price_level"],
-                                            rest_b.get("priceRange", ""),
-                                        )
-                                    if place_b_data.get("address") and isinstance(
-                                        rest_b, dict
-                                    ):
-                                        rest_b["address"] = place_b_data["address"]
-
-                    # Fallback to web search if Google Places didn't find menu items
-                    if not dishes_a and isinstance(rest_a, dict):
-                        name_a_menu = str(rest_a.get("name") or "")
-                        if name_a_menu:
-                            dishes_a = await _search_restaurant_menu(
-                                name_a_menu, location, menu_client
                             )
-                            if dishes_a and len(dishes_a) >= 2:
-                                rec_a["order"] = {
-                                    "main": dishes_a[0],
-                                    "side": dishes_a[1] if len(dishes_a) > 1 else "",
-                                    "drink": "",
-                                }
-                                if len(dishes_a) >= 3:
-                                    rec_a["backupOrder"] = {
-                                        "main": dishes_a[2],
-                                        "side": dishes_a[3]
-                                        if len(dishes_a) > 3
-                                        else "",
-                                        "drink": "",
-                                    }
-
-                    if not dishes_b and isinstance(rest_b, dict):
-                        name_b_menu = str(rest_b.get("name") or "")
-                        if name_b_menu:
-                            dishes_b = await _search_restaurant_menu(
-                                name_b_menu, location, menu_client
+                            for idx, ctx, g in (
+                                (0, context_a, guidance_a),
+                                (1, context_b, guidance_b),
                             )
-                            if dishes_b and len(dishes_b) >= 2:
-                                rec_b["order"] = {
-                                    "main": dishes_b[0],
-                                    "side": dishes_b[1] if len(dishes_b) > 1 else "",
-                                    "drink": "",
-                                }
-                                if len(dishes_b) >= 3:
-                                    rec_b["backupOrder"] = {
-                                        "main": dishes_b[2],
-                                        "side": dishes_b[3]
-                                        if len(dishes_b) > 3
-                                        else "",
-                                        "drink": "",
+                        }
+                    )
+                    shown: set[int] = set()
+                    emitted: set[int] = set()
+                    try:
+                        async for idx, (kind, payload) in merged:
+                            if kind == "partial":
+                                if all(j in shown for j in range(idx)):
+                                    shown.add(idx)
+                                    yield _sse(
+                                        {
+                                            "type": "option",
+                                            "index": idx,
+                                            "recommendation": payload,
+                                            "partial": True,
+                                        }
+                                    )
+                                continue
+
+                            rec, text, err = payload
+                            if rec is None:
+                                yield _sse(_option_error(labels[idx], err, text))
+                                yield _sse({"type": "done"})
+                                return
+                            _polish_outfit(rec)
+                            seeds[idx] = rec
+                            for j in sorted(seeds):
+                                if j in emitted or not all(
+                                    k in shown for k in range(j)
+                                ):
+                                    continue
+                                shown.add(j)
+                                emitted.add(j)
+                                yield _sse(
+                                    {
+                                        "type": "option",
+                                        "index": j,
+                                        "recommendation": seeds[j],
                                     }
+                                )
+                    finally:
+                        await merged.aclose()
+
+                # Conflict resolution: distance checks for both picks run together,
+                # then only the offending (or missing) option(s) get regenerated.
+                seeded = sorted(seeds)
+                far_list = await asyncio.gather(
+                    *[
+                        _is_too_far(seeds[i].get("restaurant") or {}, max_km=km0)
+                        for i in seeded
+                    ],
+                    return_exceptions=True,
+                )
+                far = {i: f is True for i, f in zip(seeded, far_list)}
+                async for ev in _resolve_option(
+                    state_a,
+                    index=0,
+                    label="A",
+                    guidance=guidance_a,
+                    ctx=context_a,
+                    attempts=attempts_a,
+                    widen_status="Still scanning nearby...",
+                    seed=seeds[0],
+                    seed_too_far=far.get(0),
+                ):
+                    yield ev
+                if state_a.get("failed"):
+                    yield _sse({"type": "done"})
+                    return
 
-                    # Re-emit updated recommendations with real data
-                    if dishes_a and len(dishes_a) >= 2 or place_a_data:
-                        yield _sse(
-                            {"type": "option", "index": 0, "recommendation": rec_a}
-                        )
-                    if dishes_b and len(dishes_b) >= 2 or place_b_data:
+                rest_a = state_a["rec"].get("restaurant") or {}
+                if isinstance(rest_a, dict):
+                    name_a = str(rest_a.get("name") or "").strip()
+                async for ev in _resolve_option(
+                    state_b,
+                    index=1,
+                    label="B",
+                    guidance=guidance_b,
+                    ctx=context_b,
+                    attempts=attempts_a,
+                    widen_status="Scanning a little wider in your area...",
+                    exclude_name=name_a,
+                    seed=seeds.get(1),
+                    seed_too_far=far.get(1),
+                ):
+                    yield ev
+                if state_b.get("failed"):
+                    yield _sse({"type": "done"})
+                    return
+
+                for idx, state in enumerate((state_a, state_b)):
+                    if state["rec"] is not seeds.get(idx):
+                        _polish_outfit(state["rec"])
                         yield _sse(
-                            {"type": "option", "index": 1, "recommendation": rec_b}
+                            {
+                                "type": "option",
+                                "index": idx,
+                                "recommendation": state["rec"],
+                            }
                         )
+            else:
+                yield _sse({"type": "status", "content": "Writing option A..."})
+                async for ev in _resolve_option(
+                    state_a,
+                    index=0,
+                    label="A",
+                    guidance=guidance_a,
+                    ctx=context_a,
+                    attempts=attempts_a,
+                    widen_status="Still scanning nearby...",
+                ):
+                    yield ev
+                if state_a.get("failed"):
+                    yield _sse({"type": "done"})
+                    return
 
-            except Exception as e:
-                print(f"Menu/Places search error: {e}")
-                pass  # Fall back to LLM suggestions if search fails
+                _polish_outfit(state_a["rec"])
+                yield _sse(
+                    {"type": "option", "index": 0, "recommendation": state_a["rec"]}
+                )
 
-            try:
-                place = (
-                    str(rest_b.get("name") or "") if isinstance(rest_b, dict) else ""
+                rest_a = state_a["rec"].get("restaurant") or {}
+                if isinstance(rest_a, dict):
+                    name_a = str(rest_a.get("name") or "").strip()
+
+                km_a = state_a["km"]
+                attempts_b = [km_a] + [
+                    km for km in (travel_attempts_km or []) if km > km_a
+                ]
+
+                yield _sse({"type": "status", "content": "Writing option B..."})
+                async for ev in _resolve_option(
+                    state_b,
+                    index=1,
+                    label="B",
+                    guidance=guidance_b,
+                    ctx=context_b,
+                    attempts=attempts_b,
+                    widen_status="Scanning a little wider in your area...",
+                    exclude_name=name_a,
+                ):
+                    yield ev
+                if state_b.get("failed"):
+                    yield _sse({"type": "done"})
+                    return
+
+                _polish_outfit(state_b["rec"])
+                yield _sse(
+                    {"type": "option", "index": 1, "recommendation": state_b["rec"]}
                 )
-                chatter = _extract_place_chatter(place, ground_b)
-                signals = _extract_signals(chatter + ground_b, place)
-                if chatter:
-                    rec_b["peopleSay"] = chatter
-                if signals:
-                    rec_b["signals"] = signals
-            except Exception:
-                pass
 
-            # Best-effort image URLs (parallel)
+            # Options are settled; enrichment below doesn't need the model.
+            _llm_scheduler.release(llm_ticket)
+
+            rec_a = state_a["rec"]
+            rest_a = rec_a.get("restaurant") or {}
+            rec_b = state_b["rec"]
+            rest_b = rec_b.get("restaurant") or {}
+            recs.append(rec_a)
+            recs.append(rec_b)
+
+            # Attach verbatim snippet highlights + signals for UI grounding.
+            for rec, rest, ground in (
+                (rec_a, rest_a, ground_a),
+                (rec_b, rest_b, ground_b),
+            ):
+                try:
+                    place = (
+                        str(rest.get("name") or "") if isinstance(rest, dict) else ""
+                    )
+                    chatter = _extract_place_chatter(place, ground)
+                    signals = _extract_signals(chatter + ground, place)
+                    if chatter:
+                        rec["peopleSay"] = chatter
+                    if signals:
+                        rec["signals"] = signals
+                except Exception:
+                    pass
+
+            # Best-effort image URLs
             async def _img_for(rec: dict, srcs: list[dict]) -> str:
                 """Find actual restaurant photo from their website or reviews."""
                 rest = rec.get("restaurant") or {}
@@ -2441,82 +5991,110 @@ Rules:
                 if not name:
                     return ""
 
-                try:
-                    # First: Try to find restaurant's official website
-                    async with httpx.AsyncClient(
-                        timeout=8.0, follow_redirects=True
-                    ) as c:
-                        query = f'"{name}" {address} official site -tripadvisor -yelp -google'
-                        hits = await search_web(query, client=c)
-
-                        for h in hits[:3]:
-                            url = str(h.get("url") or "")
-                            if url and not _is_bad_source_url(url):
-                                # Try to get og:image from their website
-                                img = await _og_image_from_url(url)
-                                if img:
-                                    return img
-                except Exception:
-                    pass
-
-                # Second: Try to get image from review sites about THIS restaurant
-                try:
-                    async with httpx.AsyncClient(
-                        timeout=8.0, follow_redirects=True
-                    ) as c:
-                        query = f'"{name}" restaurant food photo'
-                        imgs = await search_images(query, client=c)
-
-                        for it in imgs[:10]:
-                            src_url = str(it.get("url") or "").lower()
-                            img_url = _pick_image_url(it)
-
-                            if not img_url or _is_bad_image_url(img_url):
-                                continue
-
-                            # Check if it's from a relevant source
-                            if any(
-                                good in src_url
-                                for good in ["tripadvisor", "yelp", "blogto", "zomato"]
-                            ):
-                                # Avoid nature/landscape keywords
-                                if not any(
-                                    bad in img_url.lower()
-                                    for bad in [
-                                        "lake",
-                                        "water",
-                                        "beach",
-                                        "forest",
-                                        "mountain",
-                                        "sunset",
-                                        "sky",
-                                    ]
-                                ):
-                                    return img_url
-                except Exception:
-                    pass
-
-                # Last resort: Try source pages
-                for s in srcs[:3]:
-                    url = str(s.get("url") or "")
-                    if url and not _is_bad_source_url(url):
-                        img = await _og_image_from_url(url)
-                        if img:
-                            return img
-
-                return ""
+                return await _race_image_strategies(
+                    [
+                        ("officialSite", _image_from_official_site(name, address)),
+                        ("reviewSites", _image_from_review_sites(name)),
+                        ("sourcePages", _image_from_source_pages(srcs)),
+                    ]
+                )
 
-            imgs = await asyncio.gather(
-                _img_for(recs[0], img_sources_a),
-                _img_for(recs[1], img_sources_b),
-                return_exceptions=True,
+            def _apply_dishes(rec: dict, dishes: list[str]) -> dict:
+                rec["order"] = {
+                    "main": dishes[0],
+                    "side": dishes[1] if len(dishes) > 1 else "",
+                    "drink": "",
+                }
+                patch = {"order": rec["order"]}
+                if len(dishes) >= 3:
+                    rec["backupOrder"] = {
+                        "main": dishes[2],
+                        "side": dishes[3] if len(dishes) > 3 else "",
+                        "drink": "",
+                    }
+                    patch["backupOrder"] = rec["backupOrder"]
+                return patch
+
+            def _apply_place(i: int, data: dict) -> dict:
+                rec = recs[i]
+                rest = rec.get("restaurant")
+                patch: dict = {}
+                # A photo found by _img_for takes precedence over the Places one.
+                if data.get("photo_url") and i not in image_found:
+                    rec["imageUrl"] = data["photo_url"]
+                    patch["imageUrl"] = rec["imageUrl"]
+                if data.get("menu_items") and len(data["menu_items"]) >= 2:
+                    places_dishes.add(i)
+                    patch.update(_apply_dishes(rec, data["menu_items"]))
+                if isinstance(rest, dict):
+                    if data.get("price_level"):
+                        price_map = {1: "$", 2: "$$", 3: "$$$", 4: "$$$$"}
+                        rest["priceRange"] = price_map.get(
+                            data["price_level"], rest.get("priceRange", "")
+                        )
+                        patch["restaurant"] = rest
+                    if data.get("address"):
+                        rest["address"] = data["address"]
+                        patch["restaurant"] = rest
+                return patch
+
+            # Enrichment: Places, menu search and image discovery for both picks run
+            # at once, and each result goes out as its own `enrich` patch as soon as
+            # it lands. Places dishes beat the menu search; a menu search still
+            # running when Places supplies dishes is cancelled.
+            yield _sse(
+                {
+                    "type": "status",
+                    "content": "Looking up real menu items and photos...",
+                }
             )
-            for i, img in enumerate(imgs):
-                if isinstance(img, str) and img:
-                    recs[i]["imageUrl"] = img
-                    yield _sse(
-                        {"type": "enrich", "index": i, "patch": {"imageUrl": img}}
+            jobs: dict[asyncio.Task, tuple[int, str]] = {}
+            menu_jobs: dict[int, asyncio.Task] = {}
+            places_dishes: set[int] = set()
+            image_found: set[int] = set()
+            for i, srcs in enumerate((img_sources_a, img_sources_b)):
+                rest = recs[i].get("restaurant") or {}
+                name = str(rest.get("name") or "") if isinstance(rest, dict) else ""
+                if name and GOOGLE_PLACES_API_KEY:
+                    task = asyncio.create_task(_get_place_from_google(name, location))
+                    jobs[task] = (i, "places")
+                if name:
+                    task = asyncio.create_task(_search_restaurant_menu(name, location))
+                    jobs[task] = (i, "menu")
+                    menu_jobs[i] = task
+                jobs[asyncio.create_task(_img_for(recs[i], srcs))] = (i, "image")
+
+            pending = set(jobs)
+            try:
+                while pending:
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
                     )
+                    for task in done:
+                        i, kind = jobs[task]
+                        if task.cancelled():
+                            continue
+                        if task.exception() is not None:
+                            print(f"Enrichment ({kind}) error: {task.exception()}")
+                            continue
+                        value = task.result()
+                        patch: dict = {}
+                        if kind == "places" and value:
+                            patch = _apply_place(i, value)
+                            if i in places_dishes and i in menu_jobs:
+                                menu_jobs[i].cancel()
+                        elif kind == "menu" and i not in places_dishes:
+                            if value and len(value) >= 2:
+                                patch = _apply_dishes(recs[i], value)
+                        elif kind == "image" and isinstance(value, str) and value:
+                            recs[i]["imageUrl"] = value
+                            image_found.add(i)
+                            patch = {"imageUrl": value}
+                        if patch:
+                            yield _sse({"type": "enrich", "index": i, "patch": patch})
+            finally:
+                for task in pending:
+                    task.cancel()
 
             await _persist_session(session_id, prefs, recs, sources=sources)
 
@@ -2534,6 +6112,8 @@ Rules:
         except Exception as e:
             yield _sse({"type": "error", "message": str(e)})
             yield _sse({"type": "done"})
+        finally:
+            _llm_scheduler.release(llm_ticket)
 
     return EventSourceResponse(event_generator())
 
@@ -2556,7 +6136,26 @@ async def submit_feedback(request: FeedbackRequest):
 
 @app.get("/health")
 async def health():
-    return {"status": "ok"}
+    return {
+        "status": "ok",
+        "llmCache": _llm_cache_info(),
+        "llmHedge": _llm_hedge_info(),
+        "llmQueue": _llm_scheduler.info(),
+        "llmBreaker": _llm_breaker_info(),
+        "httpPools": _http_pool_info(),
+        "searchCache": _search_cache_info(),
+        "singleflight": _singleflight_info(),
+        "searchCorpus": _corpus_info(),
+        "geocodeCache": _geocode_cache_info(),
+        "nominatim": _nominatim.info(),
+        "gazetteer": _gazetteer.info(),
+        "placeIndex": _place_index.info(),
+        "placesCache": _places_cache_info(),
+        "imageStrategies": _image_strategy_info(),
+        "ogImage": _og_cache_info(),
+        "imageProxy": _image_proxy_info(),
+        "ollama": {**_ollama_stats, "keepAlive": _ollama_keep_alive()},
+    }
 
 
 if __name__ == "__main__":